@@ -1,13 +1,18 @@
 import pandas as pd
 import json
+import os
+import re
 import numpy as np
-from tabulate import tabulate
+from bisect import bisect_left
 from collections import OrderedDict
-import seaborn as sns
+from collections.abc import Mapping
+from contextlib import contextmanager
 from numbers import Number
 from functools import reduce
-from operator import and_
-from IPython.display import Markdown
+from operator import or_
+
+# seaborn, IPython and tabulate are imported where they are used, so
+# importing anes for data access stays cheap and works headless.
 
 __title__ = "anes"
 __description__ = "ANES for Humans"
@@ -44,6 +49,9 @@ def var_def_to_md_str(cb, name, include_notes=True):
         lines.append(header('Prompt', 2))
         lines.extend(prompt)
 
+    if 'codes' in var_def or 'source_vars' in var_def:
+        from tabulate import tabulate
+
     if 'codes' in var_def:
         lines.append(header('Codes', 2))
 
@@ -69,6 +77,22 @@ def var_def_to_md_str(cb, name, include_notes=True):
     return "\n".join(lines)
 
 
+def _markdown(s, plain=False):
+    """
+    :returns: s wrapped for display in IPython, or s itself if plain or
+        IPython is not installed
+    """
+    if not plain:
+        try:
+            from IPython.display import Markdown
+        except ImportError:
+            pass
+        else:
+            return Markdown(s)
+
+    return s
+
+
 def var_names_matching(cb, q):
     q = q.lower()
 
@@ -84,107 +108,1497 @@ def var_names_matching(cb, q):
     return matches
 
 
+TOKEN_RE = re.compile("[a-z0-9]+")
+
+FIELD_WEIGHTS = {'name': 16, 'module': 4, 'desc': 8, 'prompt': 2,
+                 'codes': 1, 'notes': 1}
+
+SEARCH_CACHE_SIZE = 1024
+
+
+def tokenize(s):
+    return TOKEN_RE.findall(s.lower())
+
+
+def searchable_fields(name, var_def):
+    yield 'name', name
+    yield 'module', var_def.get('module', '')
+    yield 'desc', var_def.get('desc', '')
+    yield 'prompt', " ".join(var_def.get('prompt', []))
+
+    for coding in var_def.get('codes', {}).values():
+        yield 'codes', " ".join(coding['codes'].values())
+
+    yield 'notes', var_def.get('notes', '')
+
+
+def search_index_path(cb_path):
+    return os.path.splitext(cb_path)[0] + ".search.json"
+
+
+class SearchIndex:
+    """
+    A token -> {var_name: score} inverted index over the codebook.
+
+    Every query term matches the tokens it prefixes; a variable has to
+    match all the terms to be returned. Results are ranked by their
+    summed, field-weighted scores, with exact token hits counting double.
+    """
+
+    def __init__(self, postings):
+        self.postings = postings
+        self.tokens = sorted(postings)
+        self._cache = OrderedDict()
+
+    @classmethod
+    def build(cls, cb):
+        postings = {}
+
+        for name, var_def in cb['var_defs'].items():
+            for field, text in searchable_fields(name, var_def):
+                weight = FIELD_WEIGHTS[field]
+                for token in tokenize(text):
+                    scores = postings.setdefault(token, {})
+                    scores[name] = scores.get(name, 0) + weight
+
+        return cls(postings)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as fp:
+            return cls(json.load(fp)['postings'])
+
+    def save(self, path):
+        # Replaced whole: other processes may be loading the old index.
+        with replacing(path) as fp:
+            json.dump({'postings': self.postings}, fp)
+
+    def _prefixed(self, prefix):
+        i = bisect_left(self.tokens, prefix)
+        while i < len(self.tokens) and self.tokens[i].startswith(prefix):
+            yield self.tokens[i]
+            i += 1
+
+    def _term_scores(self, term):
+        scores = {}
+
+        for token in self._prefixed(term):
+            boost = 2 if token == term else 1
+            for name, score in self.postings[token].items():
+                scores[name] = scores.get(name, 0) + boost * score
+
+        return scores
+
+    def search(self, q):
+        terms = tuple(tokenize(q))
+
+        res = self._cache.get(terms)
+        if res is not None:
+            self._cache.move_to_end(terms)
+            return res
+
+        scores = None
+        for term in terms:
+            term_scores = self._term_scores(term)
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {k: v + term_scores[k] for k, v in scores.items()
+                          if k in term_scores}
+
+        scores = scores or {}
+        res = sorted(scores, key=lambda k: (-scores[k], k))
+
+        self._cache[terms] = res
+        if len(self._cache) > SEARCH_CACHE_SIZE:
+            self._cache.popitem(last=False)
+
+        return res
+
+
+def compact_codebook_path(cb_path):
+    return os.path.splitext(cb_path)[0] + ".jsonl"
+
+
+class LazyRecords(Mapping):
+    """
+    The records of a `key<TAB>json` lines file (e.g. the var_defs of a
+    compact codebook), each deserialized on first access.
+    """
+
+    def __init__(self, path, offsets):
+        self._path = path
+        self._offsets = offsets
+        self._cache = {}
+
+    def __getitem__(self, k):
+        var_def = self._cache.get(k)
+
+        if var_def is None:
+            var_def = self._cache[k] = self.read(k)
+
+        return var_def
+
+    def read(self, k):
+        """
+        Deserialize record k afresh, without caching it.
+        """
+        start, length = self._offsets[k]
+        with open(self._path, "rb") as fp:
+            fp.seek(start)
+            s = fp.read(length).decode("utf-8")
+        return json.loads(s, object_hook=OrderedDict)
+
+    @classmethod
+    def open(cls, path):
+        """
+        :returns: the `@`-prefixed metadata records, parsed, and a
+            LazyRecords over the rest
+        """
+        meta, offsets = OrderedDict(), OrderedDict()
+
+        with open(path, "rb") as fp:
+            pos = 0
+            for line in fp:
+                k, _, s = line.partition(b"\t")
+                start = pos + len(k) + 1
+                k = k.decode("utf-8")
+
+                if k.startswith("@"):
+                    meta[k[1:]] = json.loads(s.decode("utf-8"),
+                                             object_hook=OrderedDict)
+                else:
+                    offsets[k] = (start, len(s))
+
+                pos += len(line)
+
+        return meta, cls(path, offsets)
+
+    def __iter__(self):
+        return iter(self._offsets)
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def __contains__(self, k):
+        return k in self._offsets
+
+
+def read_compact_codebook(path):
+    cb, var_defs = LazyRecords.open(path)
+    cb['var_defs'] = var_defs
+    return cb
+
+
+def rendered_docs_path(cb_path):
+    return os.path.splitext(cb_path)[0] + ".md.jsonl"
+
+
+def new_lineage():
+    return OrderedDict([('sources', OrderedDict()),
+                        ('derived', OrderedDict())])
+
+
+def add_lineage(lineage, var_def):
+    """
+    Index var_def's source variables in both directions: 'sources' maps
+    each variable to {year: [study vars]} and 'derived' maps each year to
+    {study var: [variables]}.
+    """
+    name, source_vars = var_def['name'], var_def.get('source_vars')
+    if not source_vars:
+        return
+
+    lineage['sources'][name] = source_vars
+    for year, study_vars in source_vars.items():
+        derived = lineage['derived'].setdefault(year, OrderedDict())
+        for study_var in study_vars:
+            derived.setdefault(study_var, []).append(name)
+
+
+def lineage_index(cb):
+    """
+    :returns: the codebook's source variables indexed both ways, as the
+        extractor stores them (see add_lineage)
+    """
+    lineage = new_lineage()
+    for var_def in cb['var_defs'].values():
+        add_lineage(lineage, var_def)
+    return lineage
+
+
+def load_codebook(cb_path):
+    compact_path = compact_codebook_path(cb_path)
+
+    if is_fresh(compact_path, cb_path):
+        return read_compact_codebook(compact_path)
+
+    with open(cb_path) as fp:
+        return json.load(fp, object_hook=OrderedDict)
+
+
+def code_values(code):
+    values = []
+
+    for part in code.split(","):
+        lo, sep, hi = part.partition("-")
+        if sep and lo:
+            values.extend(range(int(lo), int(hi) + 1))
+        else:
+            values.append(int(part))
+
+    return values
+
+
 def collect_missing_codes(cb, var_name):
     missing_values = {-100}
 
     for k, coding in cb['var_defs'][var_name].get('codes', {}).items():
         for v in coding.get('missing', []):
             if v != 'INAP':
-                missing_values.add(int(v))
+                missing_values.update(code_values(v))
 
     return missing_values
 
 
+def collect_missing_code_groups(cb, var_name):
+    groups = OrderedDict()
+
+    for k, coding in cb['var_defs'][var_name].get('codes', {}).items():
+        missing_values = {-100}
+        for v in coding.get('missing', []):
+            if v != 'INAP':
+                missing_values.update(code_values(v))
+        groups[k] = np.array(sorted(missing_values))
+
+    return groups
+
+
+# The descriptions the codebook extractor gives ranges it has none for.
+RANGE_PLACEHOLDERS = {'', 'RANGE', 'DEGREES'}
+
+
+def label_table(codings):
+    """
+    :param codings: code groups' 'codes' maps; earlier groups win, and
+        within a group single codes win over ranges
+    :returns: (lo, labels), a dense array where labels[v - lo] labels code
+        v, e.g. '1. Strong Democrat'. Codes in an undescribed range (see
+        RANGE_PLACEHOLDERS) are labeled with their value; codes without
+        a label, and the trailing slot that decode_codes sends
+        out-of-range codes to, hold None.
+    """
+    labels = {}
+
+    for coding in reversed(list(codings)):
+        ranges, singles = {}, {}
+        for code, desc in coding.items():
+            if code == 'INAP':
+                continue
+
+            for part in code.split(","):
+                lo, sep, hi = part.partition("-")
+                if sep and lo:
+                    for value in range(int(lo), int(hi) + 1):
+                        ranges[value] = str(value) \
+                            if desc in RANGE_PLACEHOLDERS \
+                            else "{}. {}".format(value, desc)
+                else:
+                    value = int(part)
+                    singles[value] = "{}. {}".format(value, desc) if desc \
+                        else str(value)
+
+        labels.update(ranges)
+        labels.update(singles)
+
+    if not labels:
+        return 0, np.array([None], dtype=object)
+
+    lo = min(labels)
+    table = np.full(max(labels) - lo + 2, None, dtype=object)
+    for value, label in labels.items():
+        table[value - lo] = label
+
+    return lo, table
+
+
+def decode_codes(x, lo, labels):
+    """
+    Label integer codes with one fancy-indexing pass over a label_table.
+    """
+    idx = np.asarray(x, dtype=np.int64) - lo
+    idx[(idx < 0) | (idx >= len(labels))] = len(labels) - 1
+    return labels[idx]
+
+
+def year_row_index(uniq, inverse):
+    order = np.argsort(inverse, kind='stable')
+    splits = np.cumsum(np.bincount(inverse, minlength=len(uniq)))[:-1]
+    return OrderedDict(zip(uniq.tolist(), np.split(order, splits)))
+
+
+def missing_mask(x, groups, year_rows, fallback):
+    """
+    Flag the missing values in x, applying each wave's own missing codes
+    where the codebook partitions them by year and fallback elsewhere.
+    """
+    x = np.asarray(x)
+
+    if not any(k.isdigit() for k in groups):
+        return np.in1d(x, fallback)
+
+    mask = np.empty(len(x), dtype=bool)
+    for year, rows in year_rows.items():
+        mask[rows] = np.in1d(x[rows], groups.get(str(year), fallback))
+
+    return mask
+
+
+def factorize(x, sort=False):
+    """
+    As pd.factorize, which (unlike np.unique) copes with object columns
+    mixing str codes and NaN, but with NaN as its own trailing level.
+
+    :returns: the levels, as an Index, and each value's level code
+    """
+    codes, levels = pd.factorize(x, sort=sort)
+    levels = pd.Index(levels)
+    if (codes < 0).any():
+        codes[codes < 0] = len(levels)
+        levels = levels.append(pd.Index([np.nan]))
+    return levels, codes
+
+
+def bincount_table(x_levels, x_codes, y_levels=None, y_codes=None,
+                   weights=None):
+    """
+    Count, or sum the weights of, the rows at each level of x (and y)
+    with a single np.bincount over the integer level codes.
+    """
+    if y_levels is None:
+        counts = np.bincount(x_codes, weights, len(x_levels))
+        return pd.Series(counts, index=x_levels)
+
+    n = len(x_levels) * len(y_levels)
+    counts = np.bincount(x_codes * len(y_levels) + y_codes, weights, n)
+    return pd.DataFrame(counts.reshape(len(x_levels), len(y_levels)),
+                        index=x_levels, columns=y_levels)
+
+
+SUMMARY_MAX_LEVELS = 256
+
+
+def summary_path(tsv_path):
+    return os.path.splitext(tsv_path)[0] + ".summary.jsonl"
+
+
+def _year_counts(codes, n_levels, year_rows, max_levels):
+    if n_levels <= max_levels:
+        return [np.bincount(codes[rows], minlength=n_levels)
+                for rows in year_rows.values()]
+
+    res = []
+    for rows in year_rows.values():
+        counts = np.bincount(codes[rows], minlength=n_levels)
+        res.append(counts if np.count_nonzero(counts) <= max_levels else None)
+    return res
+
+
+def summarize_frame(df, cb, max_levels=SUMMARY_MAX_LEVELS):
+    """
+    Summarize each codebook variable in df per year (VCF0004): its row
+    count 'n', its 'missing' count by the codebook's codes (blanks
+    included), its value 'counts' if that year has at most max_levels
+    distinct values (else None), and for numeric variables the 'sum',
+    'sumsq', 'min' and 'max' of its non-missing values. Every field
+    merges across chunks of rows; see merge_summaries. Values are taken
+    as stored (see as_stored).
+
+    :returns: an OrderedDict of var name -> year (a str) -> summary
+    """
+    uniq, inverse = np.unique(df['VCF0004'].values, return_inverse=True)
+    year_rows = year_row_index(uniq, inverse)
+    order = np.concatenate(list(year_rows.values()))
+    starts = np.cumsum([0] + [len(rows) for rows in year_rows.values()])[:-1]
+    n = np.bincount(inverse, minlength=len(uniq))
+
+    res = OrderedDict()
+    for k in df.columns:
+        if k not in cb['var_defs']:
+            continue
+
+        # As ANES will read it back, e.g. a blank code -100 in an object
+        # column as '-100', so the summary agrees with missing_mask.
+        x = as_stored(df[k].values)
+        levels, codes = factorize(x)
+
+        groups = collect_missing_code_groups(cb, k)
+        fallback = sorted(collect_missing_codes(cb, k))
+        if any(g.isdigit() for g in groups):
+            miss = np.empty(len(x), dtype=bool)
+            for year, rows in year_rows.items():
+                level_miss = levels.isin(groups.get(str(year), fallback))
+                miss[rows] = level_miss[codes[rows]]
+        else:
+            miss = levels.isin(fallback)[codes]
+
+        missing = np.bincount(inverse, miss, len(uniq))
+        counts = _year_counts(codes, len(levels), year_rows, max_levels)
+
+        numeric = x.dtype.kind in 'iuf'
+        if numeric:
+            valid = ~miss
+            values = x.astype('f8')
+            sums = np.bincount(inverse, np.where(valid, values, 0), len(uniq))
+            sumsqs = np.bincount(inverse, np.where(valid, values ** 2, 0),
+                                 len(uniq))
+            mins = np.minimum.reduceat(
+                np.where(valid, values, np.inf)[order], starts)
+            maxs = np.maximum.reduceat(
+                np.where(valid, values, -np.inf)[order], starts)
+
+        years = OrderedDict()
+        for i, year in enumerate(uniq.tolist()):
+            summary = OrderedDict([('n', int(n[i])),
+                                   ('missing', int(missing[i])),
+                                   ('counts', None)])
+            if counts[i] is not None:
+                nz = np.flatnonzero(counts[i])
+                summary['counts'] = OrderedDict(
+                    (str(levels[j]), int(counts[i][j])) for j in nz)
+
+            if numeric:
+                has_valid = missing[i] < n[i]
+                summary['sum'] = float(sums[i])
+                summary['sumsq'] = float(sumsqs[i])
+                summary['min'] = float(mins[i]) if has_valid else None
+                summary['max'] = float(maxs[i]) if has_valid else None
+
+            years[str(year)] = summary
+        res[k] = years
+
+    return res
+
+
+def _merge_extreme(f, a, b):
+    if a is None or b is None:
+        return a if b is None else b
+    return f(a, b)
+
+
+def merge_summaries(a, b, max_levels=SUMMARY_MAX_LEVELS):
+    """
+    Fold summarize_frame's results for another chunk of rows, b, into a.
+
+    :returns: a
+    """
+    for k, years in b.items():
+        into = a.setdefault(k, OrderedDict())
+
+        for year, summary in years.items():
+            acc = into.get(year)
+            if acc is None:
+                into[year] = summary
+                continue
+
+            acc['n'] += summary['n']
+            acc['missing'] += summary['missing']
+
+            if acc['counts'] is not None and summary['counts'] is not None:
+                for v, count in summary['counts'].items():
+                    acc['counts'][v] = acc['counts'].get(v, 0) + count
+                if len(acc['counts']) > max_levels:
+                    acc['counts'] = None
+            else:
+                acc['counts'] = None
+
+            if 'sum' in acc:
+                acc['sum'] += summary['sum']
+                acc['sumsq'] += summary['sumsq']
+                acc['min'] = _merge_extreme(min, acc['min'], summary['min'])
+                acc['max'] = _merge_extreme(max, acc['max'], summary['max'])
+
+    return a
+
+
+def _parse_value(s):
+    for parse in (int, float):
+        try:
+            return parse(s)
+        except ValueError:
+            pass
+    return s
+
+
 def remove_missings(df, cb, var_name):
     x = df[var_name]
     missing_values = collect_missing_codes(cb, var_name)
     return x[~np.in1d(x, list(missing_values))]
 
 
+COLUMNS_INDEX = "columns.json"
+
+
+def columns_path(tsv_path):
+    return os.path.splitext(tsv_path)[0] + ".cols"
+
+
+def is_fresh(derived_path, src_path):
+    if not os.path.exists(derived_path):
+        return False
+
+    if not os.path.exists(src_path):
+        return True
+
+    return os.path.getmtime(derived_path) >= os.path.getmtime(src_path)
+
+
+@contextmanager
+def replacing(path, mode="w", **kwargs):
+    """
+    Open a temporary file beside path and move it over path once the block
+    exits cleanly, so readers see either the old file or the complete new
+    one. On error path is left alone.
+    """
+    tmp_path = "{}.{}.tmp".format(path, os.getpid())
+
+    try:
+        with open(tmp_path, mode, **kwargs) as fp:
+            yield fp
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def read_column_index(dir_path):
+    with open(os.path.join(dir_path, COLUMNS_INDEX)) as fp:
+        return json.load(fp, object_hook=OrderedDict)
+
+
+def nulls_path(dir_path, k):
+    return os.path.join(dir_path, k + ".nulls.npy")
+
+
+def load_column(dir_path, k, dtype, mmap_mode=None):
+    x = np.load(os.path.join(dir_path, k + ".npy"), mmap_mode=mmap_mode)
+    if dtype == 'object':
+        x = x.astype(object)
+        path = nulls_path(dir_path, k)
+        if os.path.exists(path):
+            x[np.load(path)] = np.nan
+    return x
+
+
+def read_columns(dir_path, columns=None, mmap_mode=None):
+    """
+    :param mmap_mode: if set, memory-map the numeric columns and wrap them
+        without copying, so processes reading the same store share pages
+    """
+    dtypes = read_column_index(dir_path)['dtypes']
+
+    if columns is None:
+        columns = list(dtypes)
+
+    return pd.DataFrame(OrderedDict((k, load_column(dir_path, k, dtypes[k],
+                                                    mmap_mode))
+                                    for k in columns),
+                        copy=mmap_mode is None)
+
+
+def storable(x):
+    """
+    :returns: x's values as .npy can store them without pickle, and its
+        null mask. Object columns, which hold mixed str/int codes, are
+        stored as fixed-width unicode with their NaNs blanked, so only
+        they have a mask; for others it is None.
+    """
+    x = np.asarray(x)
+    if x.dtype != np.object_:
+        return x, None
+
+    nulls = pd.isna(x)
+    return np.where(nulls, "", x).astype(str), nulls
+
+
+def as_stored(x):
+    """
+    :returns: x as load_column reads it back once save_column stores it
+    """
+    values, nulls = storable(x)
+    if nulls is None:
+        return values
+
+    values = values.astype(object)
+    values[nulls] = np.nan
+    return values
+
+
+def save_column(dir_path, k, x):
+    values, nulls = storable(x)
+    np.save(os.path.join(dir_path, k + ".npy"), values)
+    if nulls is not None:
+        np.save(nulls_path(dir_path, k), nulls)
+
+
+def write_column_index(dir_path, dtypes, n_rows):
+    # Written last so its mtime marks a complete store.
+    with open(os.path.join(dir_path, COLUMNS_INDEX), "w") as fp:
+        json.dump({'n_rows': n_rows, 'dtypes': dtypes}, fp)
+
+
+def write_columns(df, dir_path):
+    os.makedirs(dir_path, exist_ok=True)
+
+    dtypes = OrderedDict()
+    for k in df.columns:
+        dtypes[k] = str(df[k].dtype)
+        save_column(dir_path, k, df[k])
+
+    write_column_index(dir_path, dtypes, len(df))
+
+
+PARTITIONS_INDEX = "partitions.json"
+
+
+def partitions_path(tsv_path):
+    return os.path.splitext(tsv_path)[0] + ".parts"
+
+
+class PartitionedStore:
+    """
+    The column store split by wave: one store per VCF0004 value, each with
+    a `_rows.npy` of its rows' positions in the full data, so a query
+    limited to a few years reads only their files.
+    """
+
+    def __init__(self, dir_path):
+        with open(os.path.join(dir_path, PARTITIONS_INDEX)) as fp:
+            index = json.load(fp, object_hook=OrderedDict)
+
+        self.dir_path = dir_path
+        self.by = index['by']
+        self.ordered = index['ordered']
+        self.dtypes = index['dtypes']
+        self.sizes = OrderedDict((int(k), n)
+                                 for k, n in index['partitions'].items())
+
+    def _part_path(self, part):
+        return os.path.join(self.dir_path, str(part))
+
+    def rows(self, part):
+        return np.load(os.path.join(self._part_path(part), "_rows.npy"),
+                       mmap_mode='r')
+
+    def column(self, part, k):
+        return load_column(self._part_path(part), k, self.dtypes[k],
+                           mmap_mode='r')
+
+
+class LazyFrame:
+    """
+    A read-only stand-in for a DataFrame that loads columns on first access.
+
+    Loaded columns are kept in LRU order and the least recently used ones
+    are dropped once their total size exceeds memory_budget (in bytes).
+    """
+
+    def __init__(self, loader, columns, n_rows=None, memory_budget=None):
+        self._loader = loader
+        self._n_rows = n_rows
+        self._cache = OrderedDict()
+        self._nbytes = 0
+        self.columns = pd.Index(columns)
+        self.memory_budget = memory_budget
+
+    @classmethod
+    def from_columns(cls, dir_path, memory_budget=None):
+        index = read_column_index(dir_path)
+        dtypes = index['dtypes']
+
+        def loader(k):
+            return load_column(dir_path, k, dtypes[k], mmap_mode='r')
+
+        return cls(loader, list(dtypes), index['n_rows'], memory_budget)
+
+    @classmethod
+    def from_tsv(cls, tsv_path, memory_budget=None):
+        columns = pd.read_csv(tsv_path, sep="\t", nrows=0,
+                              index_col=0).columns
+
+        def loader(k):
+            return pd.read_csv(tsv_path, sep="\t", usecols=[k])[k].values
+
+        return cls(loader, columns, None, memory_budget)
+
+    @property
+    def nbytes(self):
+        return self._nbytes
+
+    @property
+    def shape(self):
+        return len(self), len(self.columns)
+
+    @property
+    def index(self):
+        return pd.RangeIndex(len(self))
+
+    def __len__(self):
+        if self._n_rows is None:
+            self._n_rows = len(self._column(self.columns[0]))
+        return self._n_rows
+
+    def __contains__(self, k):
+        return k in self.columns
+
+    def __repr__(self):
+        return "LazyFrame({} rows x {} columns, {} loaded)".format(
+            len(self), len(self.columns), len(self._cache))
+
+    def _column(self, k):
+        if k in self._cache:
+            self._cache.move_to_end(k)
+            return self._cache[k]
+
+        if k not in self.columns:
+            raise KeyError(k)
+
+        x = self._loader(k)
+        self._cache[k] = x
+        self._nbytes += x.nbytes
+        self._evict()
+
+        return x
+
+    def _evict(self):
+        if self.memory_budget is None:
+            return
+
+        while self._nbytes > self.memory_budget and len(self._cache) > 1:
+            _, x = self._cache.popitem(last=False)
+            self._nbytes -= x.nbytes
+
+    def evict(self):
+        self._cache.clear()
+        self._nbytes = 0
+
+    def __getitem__(self, k):
+        if isinstance(k, str):
+            return pd.Series(self._column(k), name=k)
+
+        ks = list(k)
+        return pd.DataFrame(OrderedDict((c, self._column(c)) for c in ks),
+                            columns=ks)
+
+
+MISSING_MASK_CACHE_SIZE = 256
+
+DESCRIBE_CACHE_SIZE = 512
+
+
 class ANES:
 
-    def __init__(self, tsv_path, cb_path):
-        with open(cb_path) as fp:
-            self.cb = json.load(fp, object_hook=OrderedDict)
+    def __init__(self, tsv_path, cb_path, lazy=False, memory_budget=None,
+                 shared=False, plain=False):
+        """
+        :param lazy: if True, load columns on first access, keeping at most
+            memory_budget bytes of them loaded. Selections by year read
+            only those years from the partitioned store, if there is a
+            fresh one (see etl/extract_df.py --partition).
+        :param shared: if True, attach read-only to the memory-mapped column
+            store, which must be fresh (see etl/extract_df.py). Every
+            process attached to a store shares its pages, so load it in
+            the parent of a worker pool and workers cost next to nothing.
+        :param plain: if True, describe and search_for return markdown
+            strings rather than IPython displayables (as they do anyway
+            when IPython is not installed)
+        """
+        self.cb = load_codebook(cb_path)
+        self.plain = plain
+
+        self._cb_path = cb_path
+        self._search_index = None
+        self._missing_codes = {}
+        self._missing_masks = OrderedDict()
+        self._part_masks = OrderedDict()
+        self._label_tables = {}
+        self._lineage = None
+        self._summaries = None
+        self._tsv_path = tsv_path
+        self._rendered = OrderedDict()
+        self._rendered_docs = None
+        self._year_groups = None
+        self._year_rows = None
+        self._partitions = None
+
+        parts_path = partitions_path(tsv_path)
+        if lazy and is_fresh(os.path.join(parts_path, PARTITIONS_INDEX),
+                             tsv_path):
+            self._partitions = PartitionedStore(parts_path)
+
+        cols_path = columns_path(tsv_path)
+        cols_fresh = is_fresh(os.path.join(cols_path, COLUMNS_INDEX), tsv_path)
+
+        if shared:
+            # Not built here: workers starting together would all write
+            # the files the others are mapping.
+            if not cols_fresh:
+                raise ValueError("no fresh column store at {}; build it "
+                                 "with etl/extract_df.py".format(cols_path))
+            self.df = read_columns(cols_path, mmap_mode='r')
+        elif cols_fresh:
+            if lazy:
+                self.df = LazyFrame.from_columns(cols_path, memory_budget)
+            else:
+                self.df = read_columns(cols_path)
+        elif lazy:
+            self.df = LazyFrame.from_tsv(tsv_path, memory_budget)
+        else:
+            self.df = pd.read_csv(tsv_path, sep="\t", index_col=0)
+
+    def missing_codes(self, var_name):
+        codes = self._missing_codes.get(var_name)
+
+        if codes is None:
+            codes = np.array(sorted(collect_missing_codes(self.cb, var_name)))
+            self._missing_codes[var_name] = codes
+
+        return codes
+
+    @property
+    def year_groups(self):
+        if self._year_groups is None:
+            self._year_groups = np.unique(self.df['VCF0004'].values,
+                                          return_inverse=True)
+        return self._year_groups
+
+    @property
+    def year_rows(self):
+        if self._year_rows is None:
+            self._year_rows = year_row_index(*self.year_groups)
+        return self._year_rows
+
+    def year_mask(self, years):
+        if isinstance(years, Number):
+            years = [years]
+
+        mask = np.zeros(len(self.df), dtype=bool)
+        for year in years:
+            rows = self.year_rows.get(year)
+            if rows is not None:
+                mask[rows] = True
+        return mask
+
+    def missing_mask(self, var_name):
+        mask = self._missing_masks.get(var_name)
+
+        if mask is None:
+            groups = collect_missing_code_groups(self.cb, var_name)
+            mask = missing_mask(self.df[var_name].values, groups,
+                                self.year_rows, self.missing_codes(var_name))
+            mask.flags.writeable = False
+
+            self._missing_masks[var_name] = mask
+            if len(self._missing_masks) > MISSING_MASK_CACHE_SIZE:
+                self._missing_masks.popitem(last=False)
+        else:
+            self._missing_masks.move_to_end(var_name)
+
+        return mask
+
+    @property
+    def lineage(self):
+        if self._lineage is None:
+            self._lineage = self.cb.get('lineage') or lineage_index(self.cb)
+        return self._lineage
+
+    def sources(self, var_name):
+        """
+        :returns: {year: [study variables]} that var_name was built from
+        """
+        return self.lineage['sources'].get(var_name, OrderedDict())
+
+    def derived_from(self, year, study_var):
+        """
+        :returns: the variables built from study_var in that year's study
+        """
+        return self.lineage['derived'].get(str(year), {}).get(study_var, [])
+
+    def weight_for(self, var_name, weight='auto'):
+        if weight != 'auto':
+            return weight
+
+        var_def = self.cb['var_defs'].get(var_name, {})
+        for k in var_def.get('weights', []):
+            if k.upper() in self.df.columns:
+                return k.upper()
+
+    def _levels(self, var_name, idx):
+        if var_name == 'VCF0004':
+            years, inverse = self.year_groups
+            return years, inverse[idx]
+
+        return factorize(self.df[var_name].values[idx], sort=True)
+
+    def tabulate(self, var_name, by=None, years=None, weight='auto',
+                 strip_missings=False, normalize=False):
+        """
+        Weighted frequencies of var_name, or its crosstab against by.
+
+        :param var_name: a variable name, or a list of them to get an
+            OrderedDict of tables back
+        :param weight: a weight variable, None for raw counts, or 'auto'
+            for the first of the codebook's weights present in the data.
+            Negative or NaN weights count as zero.
+        :param normalize: if True, return proportions (of each column,
+            for crosstabs)
+        """
+        if not isinstance(var_name, str):
+            return OrderedDict((k, self.tabulate(k, by, years, weight,
+                                                 strip_missings, normalize))
+                               for k in var_name)
+
+        rows = np.ones(len(self.df), dtype=bool)
+        if years is not None:
+            rows &= self.year_mask(years)
+
+        if strip_missings:
+            rows &= ~self.missing_mask(var_name)
+            if by is not None:
+                rows &= ~self.missing_mask(by)
+
+        idx = np.flatnonzero(rows)
+
+        weights, weight = None, self.weight_for(var_name, weight)
+        if weight is not None:
+            weights = self.df[weight].values[idx].astype('f8')
+            weights[~(weights >= 0)] = 0
+
+        x_levels, x_codes = self._levels(var_name, idx)
+
+        if by is None:
+            tbl = bincount_table(x_levels, x_codes, weights=weights)
+            tbl.index.name = var_name
+        else:
+            y_levels, y_codes = self._levels(by, idx)
+            tbl = bincount_table(x_levels, x_codes, y_levels, y_codes,
+                                 weights)
+            tbl = tbl.loc[:, np.bincount(y_codes, minlength=len(y_levels)) > 0]
+            tbl.index.name, tbl.columns.name = var_name, by
+
+        if var_name == 'VCF0004':
+            tbl = tbl[np.bincount(x_codes, minlength=len(x_levels)) > 0]
+
+        if normalize:
+            tbl = tbl / tbl.sum()
+
+        return tbl
+
+    @property
+    def rendered_docs(self):
+        """
+        The pre-rendered descriptions written by etl/render_docs.py, as a
+        var name -> [with notes, without notes] mapping, or None.
+        """
+        if self._rendered_docs is None:
+            path = rendered_docs_path(self._cb_path)
+            self._rendered_docs = False
+            if is_fresh(path, self._cb_path):
+                self._rendered_docs = LazyRecords.open(path)[1]
 
-        self.df = pd.read_csv(tsv_path, sep="\t")
+        return self._rendered_docs or None
+
+    def describe_md(self, var_name, include_notes=True):
+        key = (var_name, include_notes)
+
+        s = self._rendered.get(key)
+        if s is not None:
+            self._rendered.move_to_end(key)
+            return s
+
+        docs = self.rendered_docs
+        if docs is not None and var_name in docs:
+            s = docs[var_name][0 if include_notes else 1]
+        else:
+            s = var_def_to_md_str(self.cb, var_name, include_notes)
+
+        self._rendered[key] = s
+        if len(self._rendered) > DESCRIBE_CACHE_SIZE:
+            self._rendered.popitem(last=False)
+
+        return s
 
     def describe(self, var_name, include_notes=True):
-        return Markdown(var_def_to_md_str(self.cb, var_name, include_notes))
+        return _markdown(self.describe_md(var_name, include_notes),
+                         self.plain)
+
+    @property
+    def summaries(self):
+        """
+        The per-year summaries written by etl/extract_df.py (see
+        summarize_frame), as a var name -> year -> summary mapping, or
+        None.
+        """
+        if self._summaries is None:
+            path = summary_path(self._tsv_path)
+            self._summaries = False
+            if is_fresh(path, self._tsv_path):
+                self._summaries = LazyRecords.open(path)[1]
+
+        return self._summaries or None
+
+    def _summary_record(self, var_name):
+        summaries = self.summaries
+        if summaries is not None and var_name in summaries:
+            return summaries[var_name]
+
+        ks = list(OrderedDict.fromkeys(['VCF0004', var_name]))
+        return summarize_frame(self.df[ks], self.cb)[var_name]
+
+    def summary(self, var_name, counts=False):
+        """
+        :returns: per-year statistics of var_name: n, missing and, for
+            numeric variables, the mean, std, min and max of the valid
+            values. With counts=True, the value counts instead (years by
+            values; NaN for years with too many values to count).
+            Answered from the summary artifact when there is a fresh one.
+        """
+        record = self._summary_record(var_name)
+        years = [int(year) for year in record]
+
+        if counts:
+            rows = OrderedDict((int(year), s['counts'])
+                               for year, s in record.items()
+                               if s['counts'] is not None)
+            tbl = pd.DataFrame.from_dict(rows, orient='index')
+            tbl = tbl.fillna(0).astype(int)
+            tbl.columns = [_parse_value(v) for v in tbl.columns]
+            order = sorted(tbl.columns, key=lambda v: (isinstance(v, str), v))
+            return tbl[order].reindex(years)
+
+        stats = OrderedDict()
+        for year, s in zip(years, record.values()):
+            row = OrderedDict([('n', s['n']), ('missing', s['missing'])])
+            if 'sum' in s:
+                valid = s['n'] - s['missing']
+                mean = s['sum'] / valid if valid else np.nan
+                var = np.nan
+                if valid > 1:
+                    var = max(s['sumsq'] - valid * mean ** 2, 0) / (valid - 1)
+                row['mean'], row['std'] = mean, np.sqrt(var)
+                row['min'], row['max'] = s['min'], s['max']
+            stats[year] = row
+
+        return pd.DataFrame.from_dict(stats, orient='index')
+
+    def _summary_counts(self, var_name, ignore_missing):
+        """
+        :returns: var_name's value counts over all years from its summary,
+            or None if some year's values were too many to count
+        """
+        record = self._summary_record(var_name)
+        if any(s['counts'] is None for s in record.values()):
+            return None
+
+        groups = collect_missing_code_groups(self.cb, var_name)
+        fallback = set(self.missing_codes(var_name).tolist())
+
+        counts = {}
+        for year, s in record.items():
+            # Only numeric columns' values are compared with the codes, as
+            # in missing_mask: object columns are stored as strs.
+            numeric, missing = 'sum' in s, set()
+            if ignore_missing:
+                missing = set(groups[year].tolist()) if year in groups \
+                    else fallback
+
+            for v, count in s['counts'].items():
+                if v == 'nan':
+                    continue  # NaN, which value_counts drops too.
+                if numeric:
+                    v = _parse_value(v)
+                if v not in missing:
+                    counts[v] = counts.get(v, 0) + count
+
+        return pd.Series(counts, dtype='int64')
 
     def plot_counts(self, var_name, ignore_missing=False):
         if var_name not in self.df.columns:
             return 'not found'
 
+        import seaborn as sns
         sns.set_style('white')
 
-        if ignore_missing:
-            x = remove_missings(self.df, self.cb, var_name)
-        else:
-            x = self.df[var_name]
+        counts = None
+        summaries = self.summaries
+        if summaries is not None and var_name in summaries:
+            counts = self._summary_counts(var_name, ignore_missing)
 
-        counts = x.value_counts()
+        if counts is None:
+            if ignore_missing:
+                x = self.df[var_name][~self.missing_mask(var_name)]
+            else:
+                x = self.df[var_name]
+
+            counts = x.value_counts()
         title = "{} Counts".format(var_name)
         counts.sort_index(ascending=False).plot(kind='barh', title=title)
         sns.despine()
 
+    @property
+    def search_index(self):
+        if self._search_index is None:
+            path = search_index_path(self._cb_path)
+
+            if is_fresh(path, self._cb_path):
+                self._search_index = SearchIndex.load(path)
+            else:
+                self._search_index = SearchIndex.build(self.cb)
+                try:
+                    self._search_index.save(path)
+                except OSError:
+                    pass  # Read-only data dir; rebuild next time.
+
+        return self._search_index
+
     def search_for(self, q):
-        matches = var_names_matching(self.cb, q)
+        matches = self.search_index.search(q)
         if not matches:
             return "Not found"
 
         var_defs = self.cb['var_defs']
         serps = []
-        for k in sorted(matches):
+        for k in matches:
             var_def = var_defs[k]
             serps.append([k,
                           var_def.get('module', ''),
                           var_def.get('desc', ''),
-                          " ".join(var_def.get('prompt'))])
+                          " ".join(var_def.get('prompt', []))])
 
+        from tabulate import tabulate
         s = tabulate(serps, headers=['Name', 'Module', 'Desc', 'Prompt'], tablefmt='pipe')
-        return Markdown(s)
+        return _markdown(s, self.plain)
 
     def search_for_vars(self, q):
-        matches = var_names_matching(self.cb, q)
+        matches = self.search_index.search(q)
         if not matches:
             return None
 
         res, var_defs = OrderedDict(), self.cb['var_defs']
-        for k in sorted(matches):
+        for k in matches:
             var_def = var_defs[k]
             res[k] = var_def.get('desc', '')
         return res
 
-    def select(self, k, *other_ks, years=None, strip_missings=False):
-        ks = [k] + list(other_ks)
-        strip_years = False
+    def _rows(self, ks, years, strip_missings, cache):
+        """
+        :returns: a slice when the selected rows are contiguous (so the
+            columns can be sliced as views), else an array of positions
+        """
+        if isinstance(years, Number):
+            years = [years]
 
-        if years is not None:
-            if 'VCF0004' not in ks:
-                ks.append('VCF0004')
-                strip_years = True
+        if years is not None and 'VCF0004' not in ks:
+            ks = list(ks) + ['VCF0004']
 
-            if isinstance(years, Number):
-                years = [years]
-
-        sub_df = self.df[ks].copy()
+        mask = None
 
         if years is not None:
-            idx = np.in1d(sub_df['VCF0004'], years)
-            sub_df = sub_df[idx]
+            key = ('years', tuple(sorted(years)))
+            mask = cache.get(key)
+            if mask is None:
+                mask = cache[key] = self.year_mask(years)
 
         if strip_missings:
-            conds = []
+            key = ('keep', tuple(sorted(ks)))
+            keep = cache.get(key)
+            if keep is None:
+                keep = ~reduce(or_, (self.missing_mask(k) for k in ks))
+                cache[key] = keep
+            mask = keep if mask is None else mask & keep
+
+        if mask is None:
+            return slice(None)
+
+        idx = np.flatnonzero(mask)
+        if len(idx) > 0 and idx[-1] - idx[0] + 1 == len(idx):
+            return slice(idx[0], idx[-1] + 1)
+        return idx
+
+    def label_tables(self, var_name):
+        """
+        :returns: the label_table over all of var_name's code groups, and
+            a map from year to the label_table of that year's own group
+        """
+        tables = self._label_tables.get(var_name)
+
+        if tables is None:
+            codes = self.cb['var_defs'][var_name].get('codes', {})
+            merged = label_table(c['codes'] for c in codes.values())
+            by_year = {int(k): label_table([c['codes']])
+                       for k, c in codes.items() if k.isdigit()}
+            tables = self._label_tables[var_name] = (merged, by_year)
+
+        return tables
+
+    def _decode(self, var_name, x, year_rows):
+        merged, by_year = self.label_tables(var_name)
+
+        if year_rows is None or not by_year:
+            return decode_codes(x, *merged)
+
+        labels = np.empty(len(x), dtype=object)
+        for year, rows in year_rows.items():
+            labels[rows] = decode_codes(x[rows], *by_year.get(year, merged))
+        return labels
+
+    def decode(self, var_or_frame, years_aware=True):
+        """
+        Label codes with the codebook's descriptions, e.g. 1 becomes
+        '1. Strong Democrat'. Codes in an undescribed range keep their
+        value as their label; codes the codebook does not describe become
+        None.
+
+        :param var_or_frame: a variable name, to decode its whole column,
+            or a frame from select, whose integer-coded variables are
+            decoded and other columns passed through
+        :param years_aware: if True, label each row from its own wave's
+            code group where the codebook partitions codes by year
+        :returns: a Series or DataFrame of labels
+        """
+        if isinstance(var_or_frame, str):
+            var_name = var_or_frame
+            x = self.df[var_name].values
+            if not pd.api.types.is_integer_dtype(x):
+                raise ValueError("{} is not integer coded".format(var_name))
+
+            year_rows = self.year_rows if years_aware else None
+            return pd.Series(self._decode(var_name, x, year_rows),
+                             index=self.df.index, name=var_name)
+
+        df = var_or_frame
+        year_rows = None
+        if years_aware:
+            if 'VCF0004' in df.columns:
+                years = df['VCF0004'].values
+            else:
+                years = self.df['VCF0004'].values[df.index.values]
+            year_rows = year_row_index(*np.unique(years, return_inverse=True))
+
+        columns = OrderedDict()
+        for k in df.columns:
+            x = df[k].values
+            if k in self.cb['var_defs'] and pd.api.types.is_integer_dtype(x):
+                x = self._decode(k, x, year_rows)
+            columns[k] = x
+
+        return pd.DataFrame(columns, index=df.index)
 
-            for k in sub_df.columns:
-                missing_values = collect_missing_codes(self.cb, k)
-                x = sub_df[k]
-                conds.append(~np.in1d(x, list(missing_values)))
+    def _categorical(self, var_name, x, year_rows):
+        """
+        Label x as decode would, ordering the categories by code; codes
+        the codebook does not describe are labeled with their value.
+        """
+        if var_name not in self.cb['var_defs'] or \
+                not pd.api.types.is_integer_dtype(x):
+            if x.dtype == np.object_:
+                # As strs, so mixed codes sort and 12 and '12' are one.
+                x = x.astype(object)
+                valid = ~pd.isna(x)
+                x[valid] = x[valid].astype(str)
 
-            sub_df = sub_df[reduce(and_, conds)]
+            # NaN gets code -1, which Categorical keeps as missing.
+            codes, levels = pd.factorize(x, sort=True)
+            return pd.Categorical.from_codes(
+                codes, [str(v) for v in levels.tolist()])
 
-        if strip_years:
-            del sub_df['VCF0004']
+        labels = self._decode(var_name, x, year_rows)
+        undescribed = pd.isna(labels)
+        labels[undescribed] = x[undescribed].astype(str)
 
-        return sub_df
+        categories = pd.unique(labels[np.argsort(x, kind='stable')])
+        return pd.Categorical(labels, categories)
+
+    def _part_values(self, year, k, cache):
+        key = ('part', year, k)
+        values = cache.get(key)
+        if values is None:
+            values = cache[key] = self._partitions.column(year, k)
+        return values
+
+    def _part_missing_mask(self, year, var_name, cache):
+        """
+        As missing_mask, over one partition of the partitioned store.
+        """
+        key = (year, var_name)
+        mask = self._part_masks.get(key)
+
+        if mask is None:
+            groups = collect_missing_code_groups(self.cb, var_name)
+            mask = missing_mask(self._part_values(year, var_name, cache),
+                                groups, {year: slice(None)},
+                                self.missing_codes(var_name))
+            mask.flags.writeable = False
+
+            self._part_masks[key] = mask
+            if len(self._part_masks) > MISSING_MASK_CACHE_SIZE:
+                self._part_masks.popitem(last=False)
+        else:
+            self._part_masks.move_to_end(key)
+
+        return mask
+
+    def _part_keep(self, year, ks, cache):
+        key = ('part_keep', year, tuple(sorted(ks)))
+        keep = cache.get(key)
+
+        if keep is None:
+            keep = cache[key] = ~reduce(
+                or_, (self._part_missing_mask(year, k, cache) for k in ks))
+
+        return keep
+
+    def _select_partitions(self, ks, years, strip_missings, copy,
+                           categorical, cache):
+        """
+        As _select, reading and concatenating only the years' partitions.
+        """
+        if isinstance(years, Number):
+            years = [years]
+
+        store = self._partitions
+        parts = [y for y in sorted(set(years)) if y in store.sizes]
+
+        mask_ks = ks
+        if 'VCF0004' not in ks:
+            mask_ks = list(ks) + ['VCF0004']
+
+        positions, pieces = [], OrderedDict((k, []) for k in ks)
+        for year in parts:
+            keep = slice(None)
+            if strip_missings:
+                keep = self._part_keep(year, mask_ks, cache)
+
+            positions.append(store.rows(year)[keep])
+            for k in ks:
+                pieces[k].append(self._part_values(year, k, cache)[keep])
+
+        positions = np.concatenate(positions or [np.empty(0, dtype=int)])
+        order = slice(None)
+        if not store.ordered:
+            order = np.argsort(positions, kind='stable')
+
+        year_rows = None
+        if categorical:
+            part_codes = np.repeat(np.arange(len(parts)),
+                                   [len(rows) for rows in pieces[ks[0]]])
+            year_rows = year_row_index(np.array(parts), part_codes[order])
+
+        columns = OrderedDict()
+        for k in ks:
+            if len(pieces[k]) == 1 and not copy and not strip_missings:
+                x = pieces[k][0].view()
+                x.flags.writeable = False
+            elif pieces[k]:
+                x = np.concatenate(pieces[k])[order]
+            else:
+                x = np.empty(0, dtype=store.dtypes[k])
+
+            if categorical:
+                x = self._categorical(k, x, year_rows)
+
+            columns[k] = x
+
+        return pd.DataFrame(columns, index=pd.Index(positions[order]),
+                            copy=False)
+
+    def _select(self, ks, years, strip_missings, copy, categorical, cache):
+        if years is not None and self._partitions is not None:
+            return self._select_partitions(ks, years, strip_missings, copy,
+                                           categorical, cache)
+
+        rows = self._rows(ks, years, strip_missings, cache)
+
+        year_rows = None
+        if categorical:
+            uniq, inverse = self.year_groups
+            year_rows = year_row_index(uniq, inverse[rows])
+
+        columns = OrderedDict()
+        for k in ks:
+            key = ('values', k)
+            values = cache.get(key)
+            if values is None:
+                values = cache[key] = self.df[k].values
+
+            x = values[rows]
+            if isinstance(rows, slice):
+                if copy:
+                    x = x.copy()
+                else:
+                    x = x.view()
+                    x.flags.writeable = False
+
+            if categorical:
+                x = self._categorical(k, x, year_rows)
+
+            columns[k] = x
+
+        return pd.DataFrame(columns, index=self.df.index[rows], copy=False)
+
+    def select(self, k, *other_ks, years=None, strip_missings=False,
+               copy=True, categorical=False):
+        """
+        :param copy: if False, return read-only views of the data when the
+            selected rows are contiguous rather than copying them
+        :param categorical: if True, return Categorical columns labeled
+            with the codebook's codes, e.g. '1. Strong Democrat', from
+            each row's own wave where codes are partitioned by year
+        """
+        ks = [k] + list(other_ks)
+        return self._select(ks, years, strip_missings, copy, categorical, {})
+
+    def select_rows(self, k, *other_ks, years=None, strip_missings=False):
+        """
+        :returns: the (read-only) row positions select would return,
+            without materializing any columns
+        """
+        ks = [k] + list(other_ks)
+        rows = self._rows(ks, years, strip_missings, {})
+
+        if isinstance(rows, slice):
+            rows = np.arange(len(self.df))[rows]
+        rows.flags.writeable = False
+
+        return rows
+
+    def select_many(self, specs):
+        """
+        Materialize many subsets, sharing year masks, missing masks, and
+        row indices between specs.
+
+        :param specs: lists of variable names, or dicts with 'vars' and
+            optionally 'years', 'strip_missings' and 'categorical' keys,
+            as for select
+        :returns: a list of frames in spec order. Frames over contiguous
+            rows hold read-only views of the data rather than copies.
+        """
+        cache, res = {}, []
+
+        for spec in specs:
+            if isinstance(spec, dict):
+                ks = spec['vars']
+                years = spec.get('years')
+                strip_missings = spec.get('strip_missings', False)
+                categorical = spec.get('categorical', False)
+            else:
+                ks, years = spec, None
+                strip_missings = categorical = False
+
+            if isinstance(ks, str):
+                ks = [ks]
+
+            res.append(self._select(ks, years, strip_missings, False,
+                                    categorical, cache))
+
+        return res
@@ -0,0 +1,291 @@
+"""
+A small local query server over one warm ANES instance.
+
+    python -m anes.serve data/clean/anes.tsv data/clean/anes_cb.json
+
+Endpoints (all GET, all JSON unless noted):
+
+    /search?q=party+id             {var_name: desc} in rank order
+    /describe/VCF0301              markdown text; ?format=json for var_def
+    /select?vars=VCF0301,VCF0004&years=1992,2000&strip_missings=1
+    /counts/VCF0301?by=VCF0004&years=1992&weight=auto&normalize=0
+"""
+import argparse
+import asyncio
+import json
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from inspect import signature
+from urllib.parse import parse_qsl, urlsplit
+
+import numpy as np
+import pandas as pd
+
+from anes import ANES
+
+
+CACHE_SIZE = 1024
+
+STATUS_LINES = {200: "200 OK", 400: "400 Bad Request", 404: "404 Not Found",
+                405: "405 Method Not Allowed",
+                500: "500 Internal Server Error"}
+
+
+class HTTPError(Exception):
+
+    def __init__(self, status, msg):
+        super().__init__(msg)
+        self.status = status
+
+
+def _to_json(obj):
+    return json.dumps(obj, default=_json_default,
+                      allow_nan=False).encode("utf-8")
+
+
+def _json_default(obj):
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    raise TypeError(repr(obj))
+
+
+def _flag(params, k):
+    return params.get(k, "0").lower() in {"1", "true", "yes"}
+
+
+def _years(params):
+    years = params.get("years")
+    if years:
+        try:
+            return [int(y) for y in years.split(",")]
+        except ValueError:
+            raise HTTPError(400, "years must be comma-separated integers")
+
+
+def _column_to_json(x):
+    x = np.asarray(x)
+    if x.dtype == np.float32:
+        # Through str, so 1.742 stays 1.742 rather than gaining float64
+        # digits.
+        x = x.astype(str).astype('f8')
+
+    res = x.tolist()
+    if x.dtype.kind in 'fO':
+        for i in np.flatnonzero(pd.isna(x)):
+            res[i] = None  # NaN is not JSON.
+    return res
+
+
+def _frame_to_json(df):
+    # Column by column: df.values would upcast mixed frames, e.g. integer
+    # codes to floats.
+    columns = [_column_to_json(df[k].values) for k in df.columns]
+    return {'columns': [str(k) for k in df.columns],
+            'index': _column_to_json(df.index.values),
+            'data': [list(row) for row in zip(*columns)]}
+
+
+class Service:
+    """
+    Turns (path, params) requests into (status, content type, body)
+    responses. ANES keeps unsynchronized caches, so calls into it are
+    serialized; Server runs them off the event loop.
+    """
+
+    def __init__(self, anes):
+        self.anes = anes
+        self._lock = threading.Lock()
+
+    def __call__(self, path, params):
+        parts = [p for p in path.split("/") if p]
+        if not parts:
+            raise HTTPError(404, "no endpoint")
+
+        handler = getattr(self, "do_" + parts[0], None)
+        if handler is None:
+            raise HTTPError(404, "unknown endpoint: " + parts[0])
+
+        try:
+            args = signature(handler).bind(params, *parts[1:]).args
+        except TypeError:
+            raise HTTPError(404, "no such path: " + path)
+
+        with self._lock:
+            return handler(*args)
+
+    def _check_var(self, var_name):
+        if var_name not in self.anes.df.columns:
+            raise HTTPError(404, "unknown variable: {}".format(var_name))
+
+    def do_search(self, params):
+        res = self.anes.search_for_vars(params.get("q", "")) or {}
+        return "application/json", _to_json(res)
+
+    def do_describe(self, params, var_name=None):
+        var_def = self.anes.cb['var_defs'].get(var_name)
+        if var_def is None:
+            raise HTTPError(404, "unknown variable: {}".format(var_name))
+
+        if params.get("format") == "json":
+            return "application/json", _to_json(var_def)
+
+        s = self.anes.describe_md(var_name, not _flag(params, "no_notes"))
+        return "text/markdown; charset=utf-8", s.encode("utf-8")
+
+    def do_select(self, params):
+        ks = [k for k in params.get("vars", "").split(",") if k]
+        if not ks:
+            raise HTTPError(400, "vars is required")
+        for k in ks:
+            self._check_var(k)
+
+        df = self.anes.select(*ks, years=_years(params),
+                              strip_missings=_flag(params, "strip_missings"),
+                              copy=False)
+        return "application/json", _to_json(_frame_to_json(df))
+
+    def do_counts(self, params, var_name=None):
+        self._check_var(var_name)
+        by = params.get("by")
+        if by is not None:
+            self._check_var(by)
+
+        weight = params.get("weight", "auto")
+        if weight == "none":
+            weight = None
+        elif weight != "auto":
+            self._check_var(weight)
+
+        strip_missings = _flag(params, "strip_missings")
+        tbl = self.anes.tabulate(var_name, by=by, years=_years(params),
+                                 weight=weight, strip_missings=strip_missings,
+                                 normalize=_flag(params, "normalize"))
+
+        if by is None:
+            res = {'index': _column_to_json(tbl.index.values),
+                   'data': _column_to_json(tbl.values)}
+        else:
+            res = _frame_to_json(tbl)
+        return "application/json", _to_json(res)
+
+
+class Server:
+    """
+    The asyncio front end: parses requests, answers repeated queries
+    from an LRU of rendered responses, and runs the rest on a worker
+    thread. Identical in-flight queries share one computation.
+
+    There is one worker because Service serializes its calls anyway;
+    the thread only keeps the event loop free to answer cached queries.
+    """
+
+    def __init__(self, service, cache_size=CACHE_SIZE):
+        self.service = service
+        self.cache_size = cache_size
+        self._executor = ThreadPoolExecutor(1)
+        self._cache = OrderedDict()
+        self._pending = {}
+
+    async def respond(self, target):
+        url = urlsplit(target)
+        params = dict(parse_qsl(url.query))
+        key = (url.path, tuple(sorted(params.items())))
+
+        res = self._cache.get(key)
+        if res is not None:
+            self._cache.move_to_end(key)
+            return res
+
+        fut = self._pending.get(key)
+        if fut is None:
+            loop = asyncio.get_running_loop()
+            fut = loop.run_in_executor(self._executor, self._compute,
+                                       url.path, params)
+            self._pending[key] = fut
+
+        try:
+            res = await asyncio.shield(fut)
+        finally:
+            self._pending.pop(key, None)
+
+        if res[0] == 200:
+            self._cache[key] = res
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+        return res
+
+    def _compute(self, path, params):
+        try:
+            content_type, body = self.service(path, params)
+            return 200, content_type, body
+        except HTTPError as e:
+            return e.status, "application/json", _to_json({'error': str(e)})
+        except Exception as e:
+            return 500, "application/json", _to_json({'error': repr(e)})
+
+    async def handle(self, reader, writer):
+        try:
+            request_line = await reader.readline()
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass  # Headers are ignored.
+
+            parts = request_line.decode("latin-1").split()
+            if len(parts) != 3:
+                status, content_type, body = 400, "application/json", \
+                    _to_json({'error': "malformed request"})
+            elif parts[0] != "GET":
+                status, content_type, body = 405, "application/json", \
+                    _to_json({'error': "only GET is supported"})
+            else:
+                status, content_type, body = await self.respond(parts[1])
+
+            writer.write("HTTP/1.1 {}\r\n"
+                         "Content-Type: {}\r\n"
+                         "Content-Length: {}\r\n"
+                         "Connection: close\r\n\r\n"
+                         .format(STATUS_LINES[status], content_type,
+                                 len(body)).encode("latin-1"))
+            writer.write(body)
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def serve(self, host="127.0.0.1", port=8765, unix_path=None):
+        if unix_path is not None:
+            server = await asyncio.start_unix_server(self.handle, unix_path)
+        else:
+            server = await asyncio.start_server(self.handle, host, port)
+
+        async with server:
+            await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve ANES queries")
+    parser.add_argument("tsv_path")
+    parser.add_argument("cb_path")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", dest="unix_path", default=None,
+                        help="listen on this Unix socket instead of TCP")
+    parser.add_argument("--cache-size", type=int, default=CACHE_SIZE)
+    parser.add_argument("--lazy", action="store_true")
+    parser.add_argument("--shared", action="store_true")
+    args = parser.parse_args(argv)
+
+    anes = ANES(args.tsv_path, args.cb_path, lazy=args.lazy,
+                shared=args.shared)
+    server = Server(Service(anes), args.cache_size)
+
+    try:
+        asyncio.run(server.serve(args.host, args.port, args.unix_path))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import json
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import anes
+
+
+YEARS = [1992, 2000]
+
+
+def _var_def(name, codes=None):
+    var_def = OrderedDict([('name', name),
+                           ('module', 'PARTISANSHIP'),
+                           ('desc', 'Party identification ' + name),
+                           ('prompt', ['Generally speaking, do you think?'])])
+    if codes is not None:
+        var_def['codes'] = codes
+    return var_def
+
+
+def codebook():
+    uniform = OrderedDict([('UNIFORM', OrderedDict([
+        ('codes', OrderedDict([('1', 'Strong Democrat'), ('2', 'Weak'),
+                               ('8', 'DK'), ('9', 'NA')])),
+        ('valid', ['1', '2']),
+        ('missing', ['8', '9'])]))])
+
+    by_year = OrderedDict([
+        ('1992', OrderedDict([
+            ('codes', OrderedDict([('1', 'Strong Democrat'),
+                                   ('8', 'Eight ok')])),
+            ('valid', ['1', '8']),
+            ('missing', [])])),
+        ('2000', OrderedDict([
+            ('codes', OrderedDict([('1', 'Strong Dem 2000'), ('8', 'DK')])),
+            ('valid', ['1']),
+            ('missing', ['8'])]))])
+
+    var_defs = OrderedDict([
+        ('VCF0004', _var_def('VCF0004')),
+        ('VCF0009X', _var_def('VCF0009X')),
+        ('VCF0301', _var_def('VCF0301', uniform)),
+        ('VCF0302', _var_def('VCF0302', by_year)),
+        ('VCF0900C', _var_def('VCF0900C', OrderedDict()))])
+
+    return OrderedDict([('version', None), ('var_defs', var_defs),
+                        ('notes', [])])
+
+
+def frame(n=40, seed=0):
+    """
+    A cleaned frame as df_pipeline leaves it: object columns hold str
+    codes, NaN, and the int blank code -100.
+    """
+    rng = np.random.RandomState(seed)
+    obj = np.array(rng.choice(['AB', '12', 'CD'], n), dtype=object)
+    obj[::7] = np.nan
+    obj[3::9] = -100
+
+    return pd.DataFrame(OrderedDict([
+        ('VERSION', ['ANES_cdf_VERSION:2016-Sep-10'] * n),
+        ('VCF0004', np.repeat(YEARS, n // 2).astype('i4')),
+        ('VCF0009X', rng.uniform(0.2, 3, n).astype('f4')),
+        ('VCF0301', rng.choice([1, 2, 8, 9, -100], n).astype('i4')),
+        ('VCF0302', rng.choice([1, 8, -100], n).astype('i4')),
+        ('VCF0900C', obj)]))
+
+
+@pytest.fixture
+def paths(tmp_path):
+    """
+    The cleaned TSV, column store and codebook JSON, as the ETL writes
+    them.
+    """
+    tsv_path = str(tmp_path / "anes.tsv")
+    cb_path = str(tmp_path / "anes_cb.json")
+
+    df = frame()
+    df.to_csv(tsv_path, sep="\t")
+    anes.write_columns(df, anes.columns_path(tsv_path))
+    with open(cb_path, "w") as fp:
+        json.dump(codebook(), fp)
+
+    return tsv_path, cb_path
@@ -0,0 +1,54 @@
+import os
+import subprocess
+import sys
+
+ANES_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Only plotting and markdown rendering may pull these in.
+DEFERRED_MODULES = ['seaborn', 'matplotlib', 'scipy', 'IPython', 'tabulate']
+
+
+def _run(code):
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(
+        [ANES_DIR] + [p for p in [env.get('PYTHONPATH')] if p])
+
+    return subprocess.check_output([sys.executable, "-c", code], env=env,
+                                   universal_newlines=True).split()
+
+
+def test_import_defers_heavy_modules():
+    loaded = _run("import sys, anes; "
+                  "print(' '.join(k for k in {!r} if k in sys.modules))"
+                  .format(DEFERRED_MODULES))
+
+    assert loaded == []
+
+
+PLAIN = """
+import sys
+{block}
+import anes
+data = anes.ANES({tsv!r}, {cb!r}, plain={plain})
+print(type(data.describe('VCF0301')).__name__,
+      type(data.search_for('party')).__name__,
+      'IPython' in sys.modules)
+"""
+
+
+def test_plain_returns_str_without_ipython(paths):
+    tsv_path, cb_path = paths
+
+    res = _run(PLAIN.format(block="", tsv=tsv_path, cb=cb_path, plain=True))
+
+    assert res == ['str', 'str', 'False']
+
+
+def test_str_when_ipython_is_missing(paths):
+    tsv_path, cb_path = paths
+    block = "sys.modules['IPython'] = None  # As if not installed."
+
+    res = _run(PLAIN.format(block=block, tsv=tsv_path, cb=cb_path,
+                            plain=False))
+
+    assert res[:2] == ['str', 'str']
@@ -0,0 +1,27 @@
+import numpy as np
+
+import anes
+
+
+def test_categorical_object_column_with_nan(paths):
+    data = anes.ANES(*paths)
+    x = data.df['VCF0900C']
+
+    res = data.select('VCF0900C', categorical=True)['VCF0900C']
+
+    assert list(res.cat.categories) == ['-100', '12', 'AB', 'CD']
+    assert np.array_equal(res.isna().values, x.isna().values)
+    assert (res.astype(object)[x.notna()] == x[x.notna()]).all()
+
+
+def test_categorical_labels_per_wave(paths):
+    data = anes.ANES(*paths)
+
+    res = data.select('VCF0302', years=2000, categorical=True)['VCF0302']
+
+    labels = set(res.astype(object))
+    assert '8. Eight ok' not in labels
+    assert labels <= {'-100', '1. Strong Dem 2000', '8. DK'}
+    decoded = data.decode(data.select('VCF0302', 'VCF0004', years=2000))
+    assert (res.astype(object).values ==
+            decoded['VCF0302'].fillna('-100').values).all()
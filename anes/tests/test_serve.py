@@ -0,0 +1,51 @@
+import json
+
+import pytest
+
+import anes
+from anes.serve import HTTPError, Service
+
+
+def _strict_json(body):
+    def refuse(s):
+        raise ValueError("not JSON: " + s)
+
+    return json.loads(body.decode("utf-8"), parse_constant=refuse)
+
+
+def test_select_nulls_are_json_null(paths):
+    service = Service(anes.ANES(*paths))
+
+    _, body = service("/select", {'vars': "VCF0900C,VCF0301,VCF0009X"})
+
+    res = _strict_json(body)
+    column = [row[0] for row in res['data']]
+    assert None in column
+    assert all(isinstance(row[1], int) for row in res['data'])
+
+
+def test_counts_of_object_column_with_nan(paths):
+    service = Service(anes.ANES(*paths))
+
+    _, body = service("/counts/VCF0900C", {'weight': "none"})
+
+    assert None in _strict_json(body)['index']
+
+
+def test_bad_path_is_404(paths):
+    service = Service(anes.ANES(*paths))
+
+    with pytest.raises(HTTPError) as e:
+        service("/search/x", {})
+    assert e.value.status == 404
+
+
+def test_unknown_weight_is_404(paths):
+    service = Service(anes.ANES(*paths))
+
+    with pytest.raises(HTTPError) as e:
+        service("/counts/VCF0301", {'weight': "VCF9999"})
+    assert e.value.status == 404
+
+    _, body = service("/counts/VCF0301", {'weight': "VCF0009X"})
+    assert len(_strict_json(body)['data']) == 5
@@ -0,0 +1,53 @@
+import json
+
+import pandas as pd
+
+import anes
+
+from conftest import codebook, frame
+
+
+def _write_artifact(tsv_path):
+    # As etl/extract_df.py does, from the frame before it is stored.
+    summary = anes.summarize_frame(frame(), codebook())
+    with open(anes.summary_path(tsv_path), "w") as fp:
+        for k, years in summary.items():
+            fp.write(k + "\t" + json.dumps(years) + "\n")
+
+
+def test_artifact_matches_stored_values(paths):
+    data = anes.ANES(*paths)
+
+    assert anes.summarize_frame(frame(), data.cb) == \
+        anes.summarize_frame(data.df, data.cb)
+
+
+def test_summary_artifact_matches_fallback(paths):
+    tsv_path, cb_path = paths
+    _write_artifact(tsv_path)
+
+    with_artifact = anes.ANES(tsv_path, cb_path)
+    assert with_artifact.summaries is not None
+    live = anes.ANES(tsv_path, cb_path)
+    live._summaries = False
+
+    for k in with_artifact.cb['var_defs']:
+        pd.testing.assert_frame_equal(with_artifact.summary(k),
+                                      live.summary(k))
+        pd.testing.assert_frame_equal(with_artifact.summary(k, counts=True),
+                                      live.summary(k, counts=True))
+
+
+def test_summary_counts_match_value_counts(paths):
+    tsv_path, cb_path = paths
+    _write_artifact(tsv_path)
+    data = anes.ANES(tsv_path, cb_path)
+
+    for k in ['VCF0301', 'VCF0302', 'VCF0900C']:
+        for ignore_missing in (False, True):
+            x = data.df[k]
+            if ignore_missing:
+                x = x[~data.missing_mask(k)]
+
+            counts = data._summary_counts(k, ignore_missing)
+            assert dict(counts[counts > 0]) == dict(x.value_counts())
@@ -0,0 +1,30 @@
+import numpy as np
+import pandas as pd
+
+import anes
+
+
+def test_tabulate_object_column_with_nan(paths):
+    data = anes.ANES(*paths)
+    x = data.df['VCF0900C']
+    assert x.isna().any()
+
+    tbl = data.tabulate('VCF0900C', weight=None)
+
+    expected = x.value_counts(dropna=False)
+    assert tbl.sum() == len(x)
+    assert tbl[tbl.index.isna()].iloc[0] == x.isna().sum()
+    for v, n in expected.dropna().items():
+        assert tbl[v] == n
+
+
+def test_crosstab_object_column_with_nan(paths):
+    data = anes.ANES(*paths)
+
+    tbl = data.tabulate('VCF0900C', by='VCF0004', weight=None)
+
+    assert list(tbl.columns) == [1992, 2000]
+    assert tbl.values.sum() == len(data.df)
+    assert np.array_equal(tbl.sum().values,
+                          pd.Series(data.df['VCF0004']).value_counts()
+                          .sort_index().values)
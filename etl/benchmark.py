@@ -0,0 +1,346 @@
+#!/usr/bin/env python
+"""
+Time the ETL and query hot paths on a synthetic, ANES-shaped dataset.
+
+    ./benchmark.py --output bench.json
+    ./benchmark.py --rows 5000 --vars 100 --compare bench.json
+    ./benchmark.py --only import_anes    # generates no data
+
+The synthetic files (a codebook text file and a pipe-delimited raw file
+with blank-padded cells and year-partitioned codes) are cached in the
+work directory, keyed by their shape and seed.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import modpipe
+
+ANES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..",
+                        "anes")
+sys.path.insert(0, ANES_DIR)
+import anes  # noqa: E402
+import df_pipeline  # noqa: E402
+import extract_codebook  # noqa: E402
+import extract_df  # noqa: E402
+
+
+YEARS = list(range(1948, 2017, 2))
+
+WEIGHT_VARS = sorted(df_pipeline.EXPECTED_FLOATS)
+
+OBJECT_VARS = sorted(df_pipeline.EXPECTED_OBJS - {'VERSION'})
+
+WORDS = ["party", "vote", "candidate", "thermometer", "president", "income",
+         "religion", "interest", "congress", "economy", "trust", "media",
+         "education", "race", "union", "abortion", "defense", "health"]
+
+MODULES = sorted(extract_codebook.codebook_pipeline.MODULES - {'RACE SUMMARY'})
+
+ROW_BLOCK = 5000
+
+# Only plotting and markdown rendering may pull these in.
+DEFERRED_MODULES = ['seaborn', 'matplotlib', 'scipy', 'IPython', 'tabulate']
+
+IMPORT_CHECK = ("import sys, anes; "
+                "print(' '.join(k for k in {!r} if k in sys.modules))")
+
+
+def _var_names(n_vars):
+    names = ['VCF0004'] + WEIGHT_VARS + OBJECT_VARS
+    names += ["VCF{:04d}".format(1000 + i) for i in range(n_vars - len(names))]
+    return names
+
+
+def _is_partitioned(i):
+    return i % 3 == 0
+
+
+def write_codebook(path, n_vars, rng):
+    sep = extract_codebook.LINE_SEP
+
+    with open(path, "w") as fp:
+        fp.write("\nRELEASE VERSION:  20181212\n\nGeneral notes.\n")
+
+        for i, name in enumerate(_var_names(n_vars)):
+            words = " ".join(rng.sample(WORDS, 4))
+            fp.write(sep)
+            fp.write(name.lower() + "\n\n")
+            fp.write("{}: {} ({})\n\n".format(rng.choice(MODULES),
+                                              words.capitalize(), name))
+            fp.write("TYPE:\n-----\nNumeric  Dec 0-1\n\n")
+            fp.write("QUESTION:\n---------\nDo you think about {}\n"
+                     "a lot or a little?\n\n".format(words))
+
+            if name in WEIGHT_VARS or name == 'VCF0004':
+                fp.write("VALID_CODES:\n------------\n0-9999\n\n")
+            elif _is_partitioned(i):
+                fp.write("VALID_CODES:\n------------\n")
+                for year in YEARS[::8]:
+                    fp.write("{}:\n 1. A lot\n 2. Some\n 3. A little\n"
+                             "      or none\n".format(year))
+                fp.write("\nMISSING_CODES:\n--------------\n")
+                for year in YEARS[::8]:
+                    fp.write("{}:\n 8. DK\n 9. NA\n".format(year))
+                fp.write("\n")
+            else:
+                fp.write("VALID_CODES:\n------------\n1. A lot\n2. Some\n"
+                         "3. A little\n0-100.   Degrees as given\n\n")
+                fp.write("MISSING_CODES:\n--------------\n8. DK\n"
+                         "9. NA; refused\nINAP. question not used\n\n")
+
+            fp.write("WEIGHT:\n-------\n{}\n\n".format(
+                "/".join(k.lower() for k in WEIGHT_VARS[:3])))
+            fp.write("NOTES:\n------\nAsked about {}.\n\n".format(words))
+            fp.write("SOURCE_VARS:\n------------\n")
+            for year in rng.sample(YEARS, 3):
+                fp.write("{}: V{}{:04d}\n".format(year, str(year)[2:], i))
+
+        fp.write(sep)
+        fp.write("\n\nTrailing notes.\n\n\n1\n\n\n")
+
+
+def _column_values(name, years, rng):
+    n = len(years)
+
+    if name == 'VCF0004':
+        return [str(y) for y in years]
+    elif name in WEIGHT_VARS:
+        values = ["{:.3f}".format(v) for v in rng.uniform(0.2, 3, n)]
+        blank = " " * (1 + int(name[3:7]) % 4)
+    elif name in OBJECT_VARS:
+        values = rng.choice(["AB", "CD", "12", "3X"], n).tolist()
+        blank = "  "
+    else:
+        values = rng.choice(["0", "1", "2", "3", "8", "9"], n).tolist()
+        blank = " "
+
+    for i in np.flatnonzero(rng.random(n) < 0.05):
+        values[i] = blank
+    return values
+
+
+def write_raw(path, n_vars, n_rows, seed):
+    rng = np.random.default_rng(seed)
+    names = _var_names(n_vars)
+    years = np.repeat(YEARS, -(-n_rows // len(YEARS)))[:n_rows]
+
+    with open(path, "w") as fp:
+        fp.write("|".join(["Version"] + names) + "\n")
+
+        for start in range(0, n_rows, ROW_BLOCK):
+            block_years = years[start:start + ROW_BLOCK]
+            columns = [["ANES_cdf_VERSION:2016-Sep-10"] * len(block_years)]
+            columns += [_column_values(k, block_years, rng) for k in names]
+            for row in zip(*columns):
+                fp.write("|".join(row) + "\n")
+
+
+def prepare(workdir, n_vars, n_rows, seed):
+    """
+    Write (or reuse) the synthetic raw files, then build the cleaned
+    artifacts ANES loads.
+
+    :returns: a dict of paths
+    """
+    root = os.path.join(workdir, "anes-bench-{}x{}-{}".format(n_rows, n_vars,
+                                                            seed))
+    paths = {'cb_txt': os.path.join(root, "codebook.txt"),
+             'raw': os.path.join(root, "rawdata.txt"),
+             'cb': os.path.join(root, "anes_cb.json"),
+             'tsv': os.path.join(root, "anes.tsv")}
+    os.makedirs(root, exist_ok=True)
+
+    if not os.path.exists(paths['cb_txt']):
+        write_codebook(paths['cb_txt'], n_vars, random.Random(seed))
+    if not os.path.exists(paths['raw']):
+        write_raw(paths['raw'], n_vars, n_rows, seed)
+
+    extract_codebook.write_codebook(
+        extract_codebook.iter_codebook(paths['cb_txt']), paths['cb'],
+        anes.compact_codebook_path(paths['cb']))
+    with open(paths['cb']) as fp:
+        codebook = json.load(fp)
+
+    raw_df = pd.read_csv(paths['raw'], sep="|", low_memory=False, dtype=str)
+    with modpipe.ModPipe("df_pipeline") as pipe:
+        df, summary = pipe(codebook, raw_df)
+    df.to_csv(paths['tsv'], sep="\t")
+    extract_df.write_summary(summary, anes.summary_path(paths['tsv']))
+    anes.write_columns(df, anes.columns_path(paths['tsv']))
+    extract_df.write_partitions(anes.columns_path(paths['tsv']),
+                                anes.partitions_path(paths['tsv']))
+
+    return paths
+
+
+def import_anes():
+    """
+    Import anes in a fresh interpreter, failing if that loaded any of the
+    DEFERRED_MODULES.
+    """
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(
+        [ANES_DIR] + [p for p in [env.get('PYTHONPATH')] if p])
+
+    out = subprocess.check_output(
+        [sys.executable, "-c", IMPORT_CHECK.format(DEFERRED_MODULES)],
+        env=env, universal_newlines=True)
+
+    loaded = out.split()
+    if loaded:
+        raise RuntimeError("import anes loaded {}".format(", ".join(loaded)))
+
+
+def timed(f, repeat):
+    times = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        f()
+        times.append(time.perf_counter() - t)
+
+    return OrderedDict([('min', min(times)),
+                        ('median', statistics.median(times)),
+                        ('repeat', repeat)])
+
+
+def benchmarks(paths, n_vars):
+    """
+    :returns: (name, callable) pairs; each callable runs one timed unit
+    """
+    raw_df = pd.read_csv(paths['raw'], sep="|", low_memory=False, dtype=str)
+    raw_df.columns = raw_df.columns.str.upper()
+
+    data = anes.ANES(paths['tsv'], paths['cb'])
+    cb = data.cb
+    names = _var_names(n_vars)
+    sample = names[len(names) // 2:len(names) // 2 + 12]
+
+    def codebook_pipeline():
+        extract_codebook.build_codebook(paths['cb_txt'])
+
+    def build_new_df():
+        env, df = df_pipeline.build_new_df({}, raw_df)
+        df_pipeline.recode_blanks(env, df)
+
+    def load(**kwargs):
+        return lambda: anes.ANES(paths['tsv'], paths['cb'], **kwargs)
+
+    def select(strip_missings):
+        def f():
+            for k in sample:
+                data.select(k, years=[1992, 2000],
+                            strip_missings=strip_missings)
+        return f
+
+    def select_one_year(lazy):
+        def f():
+            data = anes.ANES(paths['tsv'], paths['cb'], lazy=lazy)
+            for k in sample:
+                data.select(k, years=2000, strip_missings=True)
+        return f
+
+    def search():
+        for q in WORDS:
+            anes.var_names_matching(cb, q)
+
+    def indexed_search():
+        for q in WORDS:
+            data.search_index._cache.clear()
+            data.search_index.search(q)
+
+    def summarize():
+        for k in sample:
+            data.summary(k)
+
+    def render():
+        for k in sample:
+            anes.var_def_to_md_str(cb, k)
+
+    return [('codebook_pipeline', codebook_pipeline),
+            ('build_new_df_and_recode_blanks', build_new_df),
+            ('anes_init', load()),
+            ('anes_init_lazy', load(lazy=True)),
+            ('read_tsv', lambda: pd.read_csv(paths['tsv'], sep="\t",
+                                             index_col=0)),
+            ('select', select(False)),
+            ('select_strip_missings', select(True)),
+            ('load_and_select_one_year', select_one_year(False)),
+            ('load_and_select_one_year_partitioned', select_one_year(True)),
+            ('var_names_matching', search),
+            ('search_index', indexed_search),
+            ('var_def_to_md_str', render),
+            ('summary', summarize)]
+
+
+def compare(results, old_path):
+    with open(old_path) as fp:
+        old = json.load(fp)['results']
+
+    for k, res in results.items():
+        if k in old:
+            speedup = old[k]['median'] / res['median']
+            print("{:<40} {:>10.4f}s  {:>6.2f}x".format(k, res['median'],
+                                                       speedup))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ANES hot paths")
+    parser.add_argument("--rows", type=int, default=60000)
+    parser.add_argument("--vars", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--workdir", default=tempfile.gettempdir())
+    parser.add_argument("--only", nargs="*", default=None,
+                        help="run only these benchmarks")
+    parser.add_argument("--output", default="bench.json")
+    parser.add_argument("--compare", default=None,
+                        help="a previous --output to report speedups against")
+    args = parser.parse_args()
+
+    def selected(name):
+        return args.only is None or name in args.only
+
+    def run(name, f):
+        results[name] = timed(f, args.repeat)
+        print("{:<40} {:>10.4f}s".format(name, results[name]['median']))
+
+    # Needs no data, so it runs (and can fail) before any is generated.
+    results = OrderedDict()
+    if selected('import_anes'):
+        run('import_anes', import_anes)
+
+    if args.only is None or set(args.only) - {'import_anes'}:
+        paths = prepare(args.workdir, args.vars, args.rows, args.seed)
+        for name, f in benchmarks(paths, args.vars):
+            if selected(name):
+                run(name, f)
+
+    meta = OrderedDict([('rows', args.rows),
+                        ('vars', args.vars),
+                        ('seed', args.seed),
+                        ('time', time.strftime("%Y-%m-%dT%H:%M:%S")),
+                        ('python', platform.python_version()),
+                        ('numpy', np.__version__),
+                        ('pandas', pd.__version__),
+                        ('anes', anes.__version__)])
+
+    with open(args.output, "w") as fp:
+        json.dump({'meta': meta, 'results': results}, fp, indent=2)
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
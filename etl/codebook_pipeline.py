@@ -66,7 +66,7 @@ MODULES = {'AUTHORITARIANISM',
            'SYSTEM SUPPORT',
            'VOTE VALIDATION'}
 
-SECTION_RE = re.compile("^([A-Z\_]+):$\n^([\-]+)", re.M)
+SECTION_NAME_RE = re.compile("^([A-Z\_]+):$")
 
 KNOWN_TYPES = {'Character-1', 'Numeric  Dec 0-1', 'Numeric  Dec 4-1'}
 
@@ -87,6 +87,30 @@ SOURCE_VAR_RE = re.compile("^(\d{4}): (.*)$")
 
 EXTRANEOUS_WHITESPACE_RE = re.compile("\s{2,}")
 
+EXACT_DAYS_LINE = 'Exact number of days is coded, except:'
+
+
+def _alternative(kind, regex):
+    pattern = regex.pattern[1:-1]  # Without the anchors.
+    if regex.flags & re.I:
+        pattern = "(?i:{})".format(pattern)
+    return "(?P<{}>{})".format(kind, pattern)
+
+
+# All the code line patterns in one alternation, tried in the same order
+# as the separate matches were. The matching kind is the outermost (so
+# last closed) group; the pattern's own groups follow it.
+CODE_LINE_RE = re.compile("^(?:{})$".format("|".join([
+    _alternative('simple', SIMPLE_CODE_RE),
+    _alternative('code', CODE_RE),
+    _alternative('degrees', DEGREE_RE),
+    _alternative('range', RANGE_RE),
+    _alternative('sloppy_range', SLOPPY_RANGE_RE),
+    "(?P<exact_days>{})".format(re.escape(EXACT_DAYS_LINE))])))
+
+CODE_LINE_VALUES = {'simple': '', 'degrees': 'DEGREES', 'range': 'RANGE',
+                    'sloppy_range': 'RANGE'}
+
 
 LINE_PATCHES = {'3   Not sure; depends; DK; no opinion':
                 '3.   Not sure; depends; DK; no opinion',
@@ -144,20 +168,28 @@ def extract_module_and_desc(lines, var_def):
     _assert_and_pop_blank(lines)
 
 
+def _section_name(lines, i):
+    # A section starts with a `NAME:` line underlined with dashes.
+    if i + 1 < len(lines) and lines[i + 1].startswith('-'):
+        m = SECTION_NAME_RE.match(lines[i])
+        if m:
+            return m.group(1)
+
+
 def extract_sections(lines, var_def):
     sections, section = OrderedDict(), None
 
-    while lines:
+    i = 0
+    while i < len(lines):
         if section is None:
-            two_lines = "\n".join(lines[:2])
-            m = SECTION_RE.match(two_lines)
-            if m:
-                section = {'name': m.group(1), 'lines': []}
-                lines.pop(0)
-                lines.pop(0)
+            name = _section_name(lines, i)
+            if name is not None:
+                section = {'name': name, 'lines': []}
+                i += 2
                 continue
 
-        line = lines.pop(0)
+        line = lines[i]
+        i += 1
 
         if section:
             if line == '':
@@ -213,28 +245,17 @@ def _extract_code_groups(lines):
 
 
 def _extract_code_line(line):
-    m = SIMPLE_CODE_RE.match(line)
-    if m:
-        return m.group(1), ''
-
-    m = CODE_RE.match(line)
-    if m:
-        return m.group(1), m.group(2)
-
-    m = DEGREE_RE.match(line)
-    if m:
-        return m.group(1), 'DEGREES'
+    m = CODE_LINE_RE.match(line)
+    if m is None:
+        return None
 
-    m = RANGE_RE.match(line)
-    if m:
-        return m.group(1), 'RANGE'
-
-    m = SLOPPY_RANGE_RE.match(line)
-    if m:
-        return m.group(1), 'RANGE'
-
-    if line == 'Exact number of days is coded, except:':
+    kind, i = m.lastgroup, m.lastindex
+    if kind == 'exact_days':
         return '0-365', 'RANGE'
+    elif kind == 'code':
+        return m.group(i + 1), m.group(i + 2)
+    else:
+        return m.group(i + 1), CODE_LINE_VALUES[kind]
 
 
 def _parse_codes(code_lines):
@@ -346,7 +367,7 @@ def merge_codes(var_def):
     merged = OrderedDict()
     for group, valid_code_group in valid_codes.items():
         codes = deepcopy(valid_code_group)
-        valid, missing = set(codes), set()
+        valid, missing = list(codes), []
 
         missing_code_group = missing_codes.get(group)
         if missing_code_group is None:
@@ -357,11 +378,11 @@ def merge_codes(var_def):
 
         for k, v in missing_code_group.items():
             assert k not in codes, k
-            missing.add(k)
+            missing.append(k)
             codes[k] = v
 
         merged[group] = OrderedDict([('codes', codes),
-                                     ('valid', list(valid)),
-                                     ('missing', list(missing))])
+                                     ('valid', valid),
+                                     ('missing', missing)])
 
     var_def['codes'] = merged
@@ -1,4 +1,7 @@
 import numpy as np
+import pandas as pd
+from collections import OrderedDict
+from anes import summarize_frame
 
 
 BLANK_CODING = dict(zip([' ', '  ', '   ', '    '], [-101, -102, -103, -104]))
@@ -9,14 +12,60 @@ EXPECTED_FLOATS = {'VCF0011Y', 'VCF0010Z', 'VCF0011X', 'VCF0010Y',
                    'VCF0010X', 'VCF0011Z', 'VCF0009X', 'VCF0009Y', 'VCF0009Z'}
 
 
-def _attempt_numeric(x):
+# BLANK_CODING as a lookup from a blank's width to its code.
+BLANK_CODES = np.zeros(max(map(len, BLANK_CODING)) + 1, dtype='i4')
+BLANK_CODES[[len(k) for k in BLANK_CODING]] = list(BLANK_CODING.values())
+
+
+def _attempt_numeric(raw, dtype=None):
+    if dtype is not None:
+        return raw.astype(dtype)
+
     try:
-        return x.astype('i4')
+        return raw.astype('i4')
     except ValueError:
+        return raw.astype('f4')
+
+
+def _convert_column(x, dtype=None):
+    """
+    Convert a raw string column in one hashing pass over its cells; blank
+    detection and parsing only touch the column's distinct values.
+
+    :returns: the typed values, with blanks coded per BLANK_CODING, and a
+        {blank: count} dict
+    """
+    codes, uniques = pd.factorize(x)
+    raw = np.asarray(uniques, dtype=object)
+
+    if (codes < 0).any():
+        # NaN (an empty cell) gets its own trailing slot.
+        raw = np.append(raw, np.nan)
+        codes[codes < 0] = len(raw) - 1
+
+    text = raw.astype(str)
+    widths = np.char.str_len(text)
+    is_blank = (widths < len(BLANK_CODES)) & np.char.isspace(text)
+    blank_codes = BLANK_CODES[widths[is_blank]]
+
+    counts = np.bincount(codes, minlength=len(raw))[is_blank]
+    counts = np.bincount(widths[is_blank], counts, len(BLANK_CODES))
+    blank_counts = {" " * w: int(n) for w, n in enumerate(counts) if n}
+
+    values = None
+    if dtype != np.object_:
+        text[is_blank] = "0"
         try:
-            return x.astype('f4')
+            values = _attempt_numeric(text, dtype)
+            values[is_blank] = blank_codes
         except ValueError:
-            return x
+            pass
+
+    if values is None:
+        values = raw
+        values[is_blank] = blank_codes.tolist()
+
+    return values[codes], blank_counts
 
 
 def setup(cb, df):
@@ -29,24 +78,19 @@ def convert_all_columns_to_uppercase(env, df):
 
 
 def build_new_df(env, df):
-    new_df = df[['VERSION']].copy()
-
-    columns, blank_counts = [], {}
+    columns, blank_counts = OrderedDict([('VERSION', df['VERSION'])]), {}
+    dtypes = env.get('dtypes', {})
     for k in df.columns:
         if k == 'VERSION':
             continue
 
-        x = df[k]
-        counts = x.value_counts()
-        blanks = counts[np.in1d(counts.index, list(BLANK_CODING))]
+        columns[k], blanks = _convert_column(df[k], dtypes.get(k))
 
         if len(blanks) > 0:
-            blank_counts[k] = blanks.to_dict()
-
-        new_df[k] = _attempt_numeric(x.replace(BLANK_CODING))
+            blank_counts[k] = blanks
 
     env['blank_counts'] = blank_counts
-    return env, new_df
+    return env, pd.DataFrame(columns, index=df.index)
 
 
 def verify_only_one_blank_in_any_column(env, df):
@@ -55,8 +99,16 @@ def verify_only_one_blank_in_any_column(env, df):
 
 
 def recode_blanks(env, df):
-    recoder = dict(zip(range(-104, -100), [-100] * 4))
-    df.replace(recoder, inplace=True)
+    blank_codes = list(BLANK_CODING.values())
+
+    # Only columns that had blanks can hold blank codes.
+    for k in env['blank_counts']:
+        x = df[k]
+        df.loc[x.isin(blank_codes), k] = -100
+
+
+def summarize(env, df):
+    env['summary'] = summarize_frame(df, env['cb'])
 
 
 def verify_type_expectations(env, df):
@@ -67,5 +119,5 @@ def verify_type_expectations(env, df):
     assert float_cols == EXPECTED_FLOATS, obj_cols
 
 
-def pop_df(env, df):
-    return df
+def pop_results(env, df):
+    return df, env['summary']
@@ -1,15 +1,26 @@
 #!/usr/bin/env python
+import argparse
+import hashlib
 import json
 import os
 import re
 from collections import OrderedDict
+from collections.abc import Mapping
+from multiprocessing import Pool
 import modpipe
+from anes import LazyRecords, add_lineage, new_lineage, replacing
+import codebook_pipeline
+import profiling
 
 
 VERSION_RE = re.compile("^RELEASE VERSION:\s+(\d+)")
 LINE_SEP = "=" * 99 + "\n"
 DATA_PATH = os.path.join("data", "raw", "anes_timeseries_cdf_codebook_var.txt")
 OUTPUT_PATH = os.path.join("data", "clean", "anes_cb.json")
+COMPACT_PATH = os.path.join("data", "clean", "anes_cb.jsonl")
+HASHES_PATH = os.path.join("data", "clean", "anes_cb.hashes.json")
+CHANGES_PATH = os.path.join("data", "clean", "anes_cb.changes.json")
+CHUNK_SIZE = 32
 
 
 def defn_iterator(file_path):
@@ -36,24 +47,243 @@ def defn_iterator(file_path):
         yield lines[:-3]
 
 
-general_notes, var_defs = [], OrderedDict()
+_pipe = None
 
-version = None
-with modpipe.ModPipe("codebook_pipeline") as pipe:
-    for lines in defn_iterator(DATA_PATH):
-        if 'version' in lines:
-            version = lines['version']
+
+def _init_worker():
+    global _pipe
+    _pipe = modpipe.ModPipe("codebook_pipeline")
+
+
+def _parse_block(lines):
+    return _pipe(lines.copy())
+
+
+def _block_label(lines):
+    return lines[0] or "(general notes)"
+
+
+def parse_blocks(blocks, jobs=1, chunk_size=CHUNK_SIZE, profile=None):
+    """
+    Run each block through the codebook pipeline, yielding results in
+    input order. With jobs > 1 the blocks are parsed by a process pool
+    in chunks of chunk_size.
+
+    :param profile: a profiling.PipeProfile to record into; profiled runs
+        are always serial
+    """
+    if jobs == 1 or profile is not None:
+        with modpipe.ModPipe("codebook_pipeline") as pipe:
+            run = pipe
+            if profile is not None:
+                profile.instrument(pipe)
+                run = profile.wrap("(block)", pipe, _block_label)
+
+            for lines in blocks:
+                yield run(lines.copy())
+    else:
+        with Pool(jobs, initializer=_init_worker) as pool:
+            yield from pool.imap(_parse_block, blocks, chunk_size)
+
+
+def block_hash(lines):
+    return hashlib.sha1("\n".join(lines).encode("utf-8")).hexdigest()
+
+
+def pipeline_version():
+    with open(codebook_pipeline.__file__, "rb") as fp:
+        return hashlib.sha1(fp.read()).hexdigest()
+
+
+class PreviousRun(Mapping):
+    """
+    The var_defs of the last run by block hash, read on demand (and not
+    kept) from its compact codebook.
+    """
+
+    def __init__(self, compact_path, block_hashes):
+        self._var_defs = LazyRecords.open(compact_path)[1]
+        self._names = {h: k for k, h in block_hashes.items()
+                       if k in self._var_defs}
+
+    def __getitem__(self, h):
+        return self._var_defs.read(self._names[h])
+
+    def __contains__(self, h):
+        return h in self._names
+
+    def __iter__(self):
+        return iter(self._names)
+
+    def __len__(self):
+        return len(self._names)
+
+
+def load_previous(compact_path, hashes_path, version):
+    """
+    :returns: a map from block hash to the var_def parsed from it in the
+        last run, or an empty map if that run used another pipeline
+    """
+    if not (os.path.exists(compact_path) and os.path.exists(hashes_path)):
+        return {}
+
+    with open(hashes_path) as fp:
+        hashes = json.load(fp)
+
+    if hashes['pipeline'] != version:
+        return {}
+
+    return PreviousRun(compact_path, hashes['blocks'])
+
+
+def _unparsed_blocks(data_path, previous):
+    for lines in defn_iterator(data_path):
+        if block_hash(lines) not in previous:
+            yield lines
+
+
+def iter_codebook(data_path, jobs=1, previous=None, profile=None):
+    """
+    Parse the codebook block by block, in file order.
+
+    :param previous: a map from block hash to an already-parsed var_def;
+        matching blocks are reused rather than run through the pipeline.
+    :param profile: passed on to parse_blocks
+    :returns: an iterator of (block hash, var_def or general notes) pairs
+    """
+    previous = previous or {}
+    parsed = parse_blocks(_unparsed_blocks(data_path, previous), jobs,
+                          profile=profile)
+
+    for lines in defn_iterator(data_path):
+        h = block_hash(lines)
+        res = previous[h] if h in previous else next(parsed)
+        yield h, res
+
+
+def build_codebook(data_path, jobs=1, previous=None, profile=None):
+    """
+    The whole codebook in memory; see iter_codebook for the arguments.
+
+    :returns: the codebook and an OrderedDict of var name to block hash
+    """
+    general_notes, var_defs = [], OrderedDict()
+    block_hashes, lineage = OrderedDict(), new_lineage()
+
+    for h, res in iter_codebook(data_path, jobs, previous, profile):
+        if '_general_note_lines' in res:
+            general_notes.append(res)
         else:
-            res = pipe(lines.copy())
+            var_defs[res['name']] = res
+            block_hashes[res['name']] = h
+            add_lineage(lineage, res)
+
+    codebook = OrderedDict([('version', None)])
+    codebook['var_defs'] = var_defs
+    codebook['notes'] = general_notes
+    codebook['lineage'] = lineage
+
+    return codebook, block_hashes
+
+
+def write_codebook(parsed, output_path, compact_path, version=None):
+    """
+    Write iter_codebook's pairs out as they arrive: to output_path as the
+    codebook JSON (the same bytes json.dump would give) and to
+    compact_path as one `key<TAB>json` line per var_def, between a
+    `@version` line and `@notes` and `@lineage` lines, so readers can
+    index it by offset. Only the general notes and the lineage index
+    (see add_lineage), which both formats put last, are held back.
+
+    Both files are written beside their paths and moved into place only
+    once every block has parsed, so a failed run leaves the last
+    codebook (which parsed may still be reading from) untouched.
+
+    :returns: an OrderedDict of var name to block hash
+    """
+    general_notes, block_hashes, lineage = [], OrderedDict(), new_lineage()
+
+    # The compact file is replaced last, so it is never older than the JSON.
+    with replacing(compact_path, encoding="utf-8", newline="\n") as compact, \
+            replacing(output_path) as out:
+        compact.write("@version\t" + json.dumps(version) + "\n")
+        out.write('{"version": ' + json.dumps(version) + ', "var_defs": {')
+
+        sep = ""
+        for h, res in parsed:
             if '_general_note_lines' in res:
                 general_notes.append(res)
-            else:
-                var_defs[res['name']] = res
+                continue
+
+            k, s = res['name'], json.dumps(res)
+            compact.write(k + "\t" + s + "\n")
+            out.write(sep + json.dumps(k) + ": " + s)
+            sep = ", "
+            block_hashes[k] = h
+            add_lineage(lineage, res)
+
+        notes, lineage = json.dumps(general_notes), json.dumps(lineage)
+        out.write('}, "notes": ' + notes + ', "lineage": ' + lineage + '}')
+        compact.write("@notes\t" + notes + "\n")
+        compact.write("@lineage\t" + lineage + "\n")
+
+    return block_hashes
+
+
+def diff_hashes(old, new):
+    return OrderedDict([
+        ('added', [k for k in new if k not in old]),
+        ('changed', [k for k in new if k in old and old[k] != new[k]]),
+        ('removed', [k for k in old if k not in new])])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract the ANES codebook")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="number of parser processes (0 for all cores)")
+    parser.add_argument("--full", action="store_true",
+                        help="reparse every block, ignoring the last run")
+    parser.add_argument("--profile", metavar="PATH", default=None,
+                        help="time each pipeline stage (serially) and write "
+                             "the results to PATH as JSON")
+    parser.add_argument("--profile-memory", action="store_true",
+                        help="with --profile, also trace peak memory")
+    args = parser.parse_args()
+
+    profile = None
+    if args.profile:
+        profile = profiling.PipeProfile(memory=args.profile_memory)
+
+    version = pipeline_version()
+    previous = {}
+    if not args.full:
+        previous = load_previous(COMPACT_PATH, HASHES_PATH, version)
+
+    old_hashes = {}
+    if os.path.exists(HASHES_PATH):
+        with open(HASHES_PATH) as fp:
+            old_hashes = json.load(fp)['blocks']
+
+    parsed = iter_codebook(DATA_PATH, args.jobs or os.cpu_count(), previous,
+                           profile)
+    block_hashes = write_codebook(parsed, OUTPUT_PATH, COMPACT_PATH)
+
+    with open(HASHES_PATH, "w") as fp:
+        json.dump({'pipeline': version, 'blocks': block_hashes}, fp)
+
+    changes = diff_hashes(old_hashes, block_hashes)
+    with open(CHANGES_PATH, "w") as fp:
+        json.dump(changes, fp, indent=2)
+
+    reused = sum(h in previous for h in block_hashes.values())
+    print("reused: {} of {}".format(reused, len(block_hashes)))
+    for k, names in changes.items():
+        print("{}: {}".format(k, len(names)))
 
-codebook = OrderedDict([('version', version)])
-codebook['var_defs'] = var_defs
-codebook['notes'] = general_notes
+    if profile is not None:
+        profile.dump(args.profile)
+        print(profile.report())
 
 
-with open(OUTPUT_PATH, "w") as fp:
-    json.dump(codebook, fp)
+if __name__ == "__main__":
+    main()
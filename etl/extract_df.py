@@ -1,19 +1,249 @@
 #!/usr/bin/env python
+import argparse
 import pandas as pd
+import numpy as np
 import os
 import json
+from collections import OrderedDict
 import modpipe
+from anes import (load_column, merge_summaries, nulls_path,
+                  read_column_index, save_column, storable,
+                  write_column_index, write_columns)
+import df_pipeline
+import profiling
 
 OUTPUT_PATH = os.path.join("data", "clean", "anes.tsv")
+COLUMNS_PATH = os.path.join("data", "clean", "anes.cols")
+PARTITIONS_PATH = os.path.join("data", "clean", "anes.parts")
+PARTITIONS_INDEX = "partitions.json"
+PARTITION_BY = 'VCF0004'
 INPUT_PATH = os.path.join("data", "raw", "anes_timeseries_cdf_rawdata.txt")
 CODEBOOK_PATH = os.path.join("data", "clean", "anes_cb.json")
+SUMMARY_PATH = os.path.join("data", "clean", "anes.summary.jsonl")
 
-with open(CODEBOOK_PATH) as fp:
-    cb = json.load(fp)
+# Widening order for per-chunk dtype decisions.
+DTYPE_RANKS = {np.dtype('i4'): 0, np.dtype('f4'): 1, np.dtype('O'): 2}
 
-df = pd.read_csv(INPUT_PATH, sep="|", low_memory=False, dtype=str)
+# Profiled columns compete for the slowest list under their names.
+PROFILE_LABELS = {'_convert_column': lambda x, dtype=None: x.name}
 
-with modpipe.ModPipe("df_pipeline") as pipe:
-    new_df = pipe(cb, df)
 
-new_df.to_csv(OUTPUT_PATH, sep="\t")
+def write_summary(summary, path):
+    # One `var<TAB>json` line per variable, so readers can index by offset.
+    with open(path, "w", encoding="utf-8", newline="\n") as fp:
+        for k, years in summary.items():
+            fp.write(k + "\t" + json.dumps(years) + "\n")
+
+
+def verify_columns(tsv_path, dir_path, chunk_size=None):
+    dtypes = read_column_index(dir_path)['dtypes']
+
+    columns = {k: np.load(os.path.join(dir_path, k + ".npy"), mmap_mode='r')
+               for k in dtypes}
+    nulls = {k: np.load(nulls_path(dir_path, k), mmap_mode='r')
+             for k, dtype in dtypes.items() if dtype == 'object'}
+
+    tsv_chunks = pd.read_csv(tsv_path, sep="\t", index_col=0,
+                             low_memory=False, chunksize=chunk_size)
+    if chunk_size is None:
+        tsv_chunks = [tsv_chunks]
+
+    start = 0
+    for tsv_df in tsv_chunks:
+        assert list(dtypes) == list(tsv_df.columns)
+        stop = start + len(tsv_df)
+
+        for k, dtype in dtypes.items():
+            x, y = columns[k][start:stop], tsv_df[k]
+            if k in nulls:
+                y_nulls = y.isna().values
+                assert np.array_equal(nulls[k][start:stop], y_nulls), k
+                x, y = x[~y_nulls], y[~y_nulls].astype(str)
+            else:
+                y = y.astype(dtype)
+            assert np.array_equal(x, y.values), k
+
+        start = stop
+
+
+def write_partitions(cols_path, parts_path, by=PARTITION_BY):
+    """
+    Split the column store into one store per value of `by` (per wave),
+    each with a `_rows.npy` of its rows' positions in the full data.
+    Columns are read one at a time, memory-mapped.
+    """
+    index = read_column_index(cols_path)
+
+    keys = np.load(os.path.join(cols_path, by + ".npy"))
+    uniq, inverse = np.unique(keys, return_inverse=True)
+    order = np.argsort(inverse, kind='stable')
+    splits = np.cumsum(np.bincount(inverse, minlength=len(uniq)))[:-1]
+    part_rows = OrderedDict(zip(uniq.tolist(), np.split(order, splits)))
+
+    for part, rows in part_rows.items():
+        part_path = os.path.join(parts_path, str(part))
+        os.makedirs(part_path, exist_ok=True)
+        np.save(os.path.join(part_path, "_rows.npy"), rows)
+
+    for k, dtype in index['dtypes'].items():
+        x = load_column(cols_path, k, dtype, mmap_mode='r')
+        for part, rows in part_rows.items():
+            save_column(os.path.join(parts_path, str(part)), k, x[rows])
+
+    for part, rows in part_rows.items():
+        write_column_index(os.path.join(parts_path, str(part)),
+                           index['dtypes'], len(rows))
+
+    # As for each partition's own index, this goes last.
+    with open(os.path.join(parts_path, PARTITIONS_INDEX), "w") as fp:
+        json.dump({'by': by,
+                   'n_rows': index['n_rows'],
+                   'ordered': bool((np.diff(order) > 0).all()),
+                   'dtypes': index['dtypes'],
+                   'partitions': OrderedDict((str(part), len(rows))
+                                             for part, rows
+                                             in part_rows.items())}, fp)
+
+
+def _read_raw_chunks(chunk_size):
+    return pd.read_csv(INPUT_PATH, sep="|", low_memory=False, dtype=str,
+                       chunksize=chunk_size)
+
+
+def scan_chunks(chunk_size):
+    """
+    First pass: settle each column's dtype, blank counts, and (for object
+    columns) the stored string width over every chunk of the raw file.
+    """
+    dtypes, widths, blank_counts, n_rows = OrderedDict(), {}, {}, 0
+
+    for chunk in _read_raw_chunks(chunk_size):
+        env, chunk = df_pipeline.convert_all_columns_to_uppercase({}, chunk)
+        env, new_chunk = df_pipeline.build_new_df(env, chunk)
+
+        for k, dtype in new_chunk.dtypes.items():
+            if DTYPE_RANKS[dtype] > DTYPE_RANKS[dtypes.get(k, dtype)]:
+                dtypes[k] = dtype
+            else:
+                dtypes.setdefault(k, dtype)
+
+            if dtype == np.object_:
+                width = new_chunk[k].astype(str).str.len().max()
+                widths[k] = max(widths.get(k, 1), width)
+
+        for k, counts in env['blank_counts'].items():
+            merged = blank_counts.setdefault(k, {})
+            for blank, n in counts.items():
+                merged[blank] = merged.get(blank, 0) + n
+
+        n_rows += len(new_chunk)
+
+    return dtypes, widths, blank_counts, n_rows
+
+
+def convert_in_chunks(cb, chunk_size):
+    """
+    Second pass: convert each chunk with the dtypes fixed by scan_chunks
+    and append it to the TSV and the column store.
+
+    :returns: the summary of every chunk, merged
+    """
+    dtypes, widths, blank_counts, n_rows = scan_chunks(chunk_size)
+
+    env = {'cb': cb, 'blank_counts': blank_counts}
+    df_pipeline.verify_only_one_blank_in_any_column(env, None)
+
+    os.makedirs(COLUMNS_PATH, exist_ok=True)
+    columns, nulls = OrderedDict(), OrderedDict()
+    for k, dtype in dtypes.items():
+        store_dtype = 'U{}'.format(widths[k]) if k in widths else dtype
+        columns[k] = np.lib.format.open_memmap(
+            os.path.join(COLUMNS_PATH, k + ".npy"), mode='w+',
+            dtype=store_dtype, shape=(n_rows,))
+        if k in widths:
+            nulls[k] = np.lib.format.open_memmap(
+                nulls_path(COLUMNS_PATH, k), mode='w+', dtype=bool,
+                shape=(n_rows,))
+
+    start, header, summary = 0, True, OrderedDict()
+    for chunk in _read_raw_chunks(chunk_size):
+        chunk_env = {'cb': cb, 'dtypes': dtypes}
+        chunk_env, chunk = df_pipeline.convert_all_columns_to_uppercase(
+            chunk_env, chunk)
+        chunk_env, new_chunk = df_pipeline.build_new_df(chunk_env, chunk)
+        df_pipeline.recode_blanks(chunk_env, new_chunk)
+        df_pipeline.summarize(chunk_env, new_chunk)
+        merge_summaries(summary, chunk_env['summary'])
+
+        if header:
+            df_pipeline.verify_type_expectations(env, new_chunk)
+
+        new_chunk.to_csv(OUTPUT_PATH, sep="\t", mode="w" if header else "a",
+                         header=header)
+
+        stop = start + len(new_chunk)
+        for k, x in columns.items():
+            x[start:stop], chunk_nulls = storable(new_chunk[k])
+            if k in nulls:
+                nulls[k][start:stop] = chunk_nulls
+        start, header = stop, False
+
+    for x in list(columns.values()) + list(nulls.values()):
+        x.flush()
+
+    write_column_index(COLUMNS_PATH,
+                       OrderedDict((k, str(v)) for k, v in dtypes.items()),
+                       n_rows)
+
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract the ANES data")
+    parser.add_argument("--chunk-size", type=int, default=None,
+                        help="stream the raw file in chunks of this many rows")
+    parser.add_argument("--partition", action="store_true",
+                        help="also write the column store split by year")
+    parser.add_argument("--profile", metavar="PATH", default=None,
+                        help="time each pipeline stage and write the results "
+                             "to PATH as JSON")
+    parser.add_argument("--profile-memory", action="store_true",
+                        help="with --profile, also trace peak memory")
+    args = parser.parse_args()
+
+    profile = None
+    if args.profile:
+        profile = profiling.PipeProfile(memory=args.profile_memory)
+
+    with open(CODEBOOK_PATH) as fp:
+        cb = json.load(fp)
+
+    if args.chunk_size:
+        if profile is not None:
+            profile.instrument_module(df_pipeline, labels=PROFILE_LABELS)
+        summary = convert_in_chunks(cb, args.chunk_size)
+    else:
+        df = pd.read_csv(INPUT_PATH, sep="|", low_memory=False, dtype=str)
+
+        with modpipe.ModPipe("df_pipeline") as pipe:
+            if profile is not None:
+                profile.instrument(pipe, PROFILE_LABELS)
+            new_df, summary = pipe(cb, df)
+
+        new_df.to_csv(OUTPUT_PATH, sep="\t")
+        write_columns(new_df, COLUMNS_PATH)
+
+    write_summary(summary, SUMMARY_PATH)
+
+    verify_columns(OUTPUT_PATH, COLUMNS_PATH, args.chunk_size)
+
+    if args.partition:
+        write_partitions(COLUMNS_PATH, PARTITIONS_PATH)
+
+    if profile is not None:
+        profile.dump(args.profile)
+        print(profile.report())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+Opt-in per-stage instrumentation for the modpipe pipelines.
+
+    profile = PipeProfile(memory=True)
+    with modpipe.ModPipe("df_pipeline") as pipe:
+        profile.instrument(pipe)
+        new_df = pipe(cb, df)
+    print(profile.report())
+
+Times are inclusive: a helper called from a stage counts toward both.
+"""
+import heapq
+import json
+import sys
+import time
+import tracemalloc
+from collections import OrderedDict
+from functools import wraps
+from inspect import isfunction
+
+
+TOP_N = 10
+
+
+def _functions(module):
+    return [k for k, v in vars(module).items()
+            if isfunction(v) and v.__module__ == module.__name__]
+
+
+class PipeProfile:
+    """
+    Records wall time, call count and (with memory=True, via tracemalloc)
+    the peak memory growth of each wrapped stage or helper, plus the
+    slowest labelled items such as codebook blocks or data columns.
+    """
+
+    def __init__(self, memory=False, top_n=TOP_N):
+        self.memory = memory
+        self.top_n = top_n
+        self.stages = OrderedDict()
+        self._slowest = []
+        self._peaks = []
+
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def wrap(self, name, f, label=None):
+        """
+        :param label: if given, maps the call's arguments to a name under
+            which the call competes for the slowest-items list
+        """
+        stats = self.stages.setdefault(
+            name, OrderedDict([('calls', 0), ('wall', 0.0), ('peak', 0)]))
+
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            # Labels are taken up front; stages may consume their args.
+            item = None if label is None else label(*args, **kwargs)
+
+            if self.memory:
+                start_mem, peak = tracemalloc.get_traced_memory()
+                if self._peaks:
+                    self._peaks[-1] = max(self._peaks[-1], peak)
+                self._peaks.append(start_mem)
+                tracemalloc.reset_peak()
+
+            t = time.perf_counter()
+            try:
+                return f(*args, **kwargs)
+            finally:
+                wall = time.perf_counter() - t
+                stats['calls'] += 1
+                stats['wall'] += wall
+
+                if self.memory:
+                    peak = max(tracemalloc.get_traced_memory()[1],
+                               self._peaks.pop())
+                    stats['peak'] = max(stats['peak'], peak - start_mem)
+                    if self._peaks:
+                        self._peaks[-1] = max(self._peaks[-1], peak)
+
+                if label is not None:
+                    self._add_slow(wall, name, item)
+
+        return wrapper
+
+    def _add_slow(self, wall, name, item):
+        entry = (wall, name, str(item))
+        if len(self._slowest) < self.top_n:
+            heapq.heappush(self._slowest, entry)
+        else:
+            heapq.heappushpop(self._slowest, entry)
+
+    def instrument_module(self, module, names=None, labels=None):
+        """
+        Replace the module's functions (all of them by default) with
+        wrapped versions, so calls through module globals are recorded.
+
+        :param labels: a map from function name to a label callable, see
+            wrap
+        """
+        labels = labels or {}
+        if names is None:
+            names = _functions(module)
+
+        for k in names:
+            setattr(module, k, self.wrap(k, getattr(module, k), labels.get(k)))
+
+    def instrument(self, pipe, labels=None):
+        """
+        Wrap a ModPipe's stages, and the helpers in its module, in place.
+        Call this after entering the pipe: reloading it drops the wrappers.
+        """
+        labels = labels or {}
+        module = sys.modules[pipe.module_name]
+        self.instrument_module(module,
+                               [k for k in _functions(module)
+                                if k.startswith('_')],
+                               labels)
+
+        for k, f in list(pipe._pipeline.items()):
+            wrapped = self.wrap(k, f, labels.get(k))
+            pipe._pipeline[k] = wrapped
+            pipe._signatures[wrapped] = pipe._signatures.pop(f)
+            pipe._expected_args[wrapped] = pipe._expected_args.pop(f)
+
+    @property
+    def slowest(self):
+        return [OrderedDict([('name', name), ('item', item), ('wall', wall)])
+                for wall, name, item in sorted(self._slowest, reverse=True)]
+
+    def to_dict(self):
+        return OrderedDict([('stages', self.stages),
+                            ('slowest', self.slowest)])
+
+    def dump(self, path):
+        with open(path, "w") as fp:
+            json.dump(self.to_dict(), fp, indent=2)
+
+    def report(self):
+        """
+        :returns: the stages as a text table, slowest first, followed by
+            the slowest labelled items
+        """
+        lines = ["{:<40} {:>8} {:>10} {:>12}".format(
+            "stage", "calls", "wall (s)", "peak (MB)")]
+        by_wall = sorted(self.stages.items(), key=lambda p: -p[1]['wall'])
+        for k, stats in by_wall:
+            if stats['calls']:
+                lines.append("{:<40} {:>8} {:>10.3f} {:>12.1f}".format(
+                    k, stats['calls'], stats['wall'], stats['peak'] / 2**20))
+
+        if self._slowest:
+            lines.extend(["", "slowest:"])
+            for res in self.slowest:
+                lines.append("  {:<38} {:>10.3f}  ({})".format(
+                    res['item'], res['wall'], res['name']))
+
+        return "\n".join(lines)
@@ -0,0 +1,22 @@
+#!/usr/bin/env python
+import json
+import os
+from anes import load_codebook, rendered_docs_path, var_def_to_md_str
+
+
+CODEBOOK_PATH = os.path.join("data", "clean", "anes_cb.json")
+
+
+def main():
+    cb = load_codebook(CODEBOOK_PATH)
+
+    with open(rendered_docs_path(CODEBOOK_PATH), "w", encoding="utf-8",
+              newline="\n") as fp:
+        for k in cb['var_defs']:
+            docs = [var_def_to_md_str(cb, k, True),
+                    var_def_to_md_str(cb, k, False)]
+            fp.write(k + "\t" + json.dumps(docs) + "\n")
+
+
+if __name__ == "__main__":
+    main()